@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+import collections.abc
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+def _popcount(n):
+    return bin(n).count('1')
+
+if hasattr(int, 'bit_count'):
+    _popcount = int.bit_count
+
+
+class UserSet(collections.abc.Set):
+    """An immutable set of user ids, stored as the bits of a single int.
+
+    Intersections, unions and differences of two UserSets are single bitwise
+    operations on those ints, which is much faster and smaller than doing the
+    same with Python sets of Badges or user ids.
+    """
+
+    __slots__ = 'bits',
+
+    def __init__(self, bits=0):
+        self.bits = bits
+
+    @classmethod
+    def from_user_ids(cls, user_ids):
+        user_ids = list(user_ids)
+        if not user_ids:
+            return cls()
+
+        # Setting the bits in a bytearray and converting it once is much
+        # cheaper than building up the int one bit at a time.
+        bitmap = bytearray(max(user_ids) // 8 + 1)
+        for user_id in user_ids:
+            bitmap[user_id >> 3] |= 1 << (user_id & 7)
+
+        return cls(int.from_bytes(bytes(bitmap), 'little'))
+
+    @classmethod
+    def from_badges(cls, badges):
+        return cls.from_user_ids(badge.user_id for badge in badges)
+
+    @classmethod
+    def _from_iterable(cls, user_ids):
+        return cls.from_user_ids(user_ids)
+
+    def __contains__(self, user_id):
+        return (
+            isinstance(user_id, int) and user_id >= 0 and
+            bool((self.bits >> user_id) & 1))
+
+    def __iter__(self):
+        bitmap = self.bits.to_bytes((self.bits.bit_length() + 7) // 8, 'little')
+        for byte_index, byte in enumerate(bitmap):
+            if byte:
+                for bit_index in range(8):
+                    if byte & (1 << bit_index):
+                        yield byte_index * 8 + bit_index
+
+    def __len__(self):
+        return _popcount(self.bits)
+
+    def __bool__(self):
+        return self.bits != 0
+
+    def __and__(self, other):
+        if isinstance(other, UserSet):
+            return UserSet(self.bits & other.bits)
+        return super().__and__(other)
+
+    def __or__(self, other):
+        if isinstance(other, UserSet):
+            return UserSet(self.bits | other.bits)
+        return super().__or__(other)
+
+    def __sub__(self, other):
+        if isinstance(other, UserSet):
+            return UserSet(self.bits & ~other.bits)
+        return super().__sub__(other)
+
+    def __xor__(self, other):
+        if isinstance(other, UserSet):
+            return UserSet(self.bits ^ other.bits)
+        return super().__xor__(other)
+
+    def __eq__(self, other):
+        if isinstance(other, UserSet):
+            return self.bits == other.bits
+        return super().__eq__(other)
+
+    def __repr__(self):
+        return '<{} of {} users>'.format(self.__class__.__name__, len(self))
+
+
+class UserIndex(object):
+    """UserSets of everyone who has been awarded a badge, both overall and
+    grouped by reason (for election badges, by election).
+    """
+
+    def __init__(self, badge_data):
+        self.host = badge_data.host
+        self.badge_id = badge_data.badge_id
+        self.all = UserSet.from_badges(badge_data)
+        self.by_reason = {
+            reason: UserSet.from_badges(badges)
+            for reason, badges in badge_data.by_reason().items()
+        }
+
+    def __repr__(self):
+        return (
+            '<{0.__class__.__name__} for {0.host}/badges/{0.badge_id} with '
+            '{1} users>'.format(self, len(self.all)))
+
+
+def fraction_also_in(users, other_users):
+    """Returns the fraction of users who are also in other_users, such as the
+    fraction of an election's Caucus recipients who went on to vote, or the
+    fraction of its voters who voted again in the next election.
+    """
+    if not users:
+        return 0.0
+    return len(users & other_users) / len(users)
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+import logging
+
+import analytics
+import scraping
+import testing
+
+
+logger = logging.getLogger(__name__)
+
+
+def test_user_set_operations():
+    a = analytics.UserSet.from_user_ids([1, 5, 102937, 8])
+    b = analytics.UserSet.from_user_ids([5, 8, 9])
+
+    assert len(a) == 4
+    assert 102937 in a
+    assert 9 not in a
+    assert list(a) == [1, 5, 8, 102937]
+
+    assert list(a & b) == [5, 8]
+    assert list(a | b) == [1, 5, 8, 9, 102937]
+    assert list(a - b) == [1, 102937]
+    assert list(a ^ b) == [1, 9, 102937]
+    assert a & b == {5, 8}
+    assert a & {1, 2} == {1}
+
+    assert not analytics.UserSet()
+    assert len(analytics.UserSet.from_user_ids([])) == 0
+
+
+def test_fraction_also_in():
+    viewers = analytics.UserSet.from_user_ids([1, 2, 3, 4])
+    voters = analytics.UserSet.from_user_ids([2, 4, 6])
+
+    assert analytics.fraction_also_in(viewers, voters) == 0.5
+    assert analytics.fraction_also_in(analytics.UserSet(), voters) == 0.0
+
+
+def test_user_index():
+    first = 'for an <a href="/election/1">election</a>'
+    second = 'for an <a href="/election/2">election</a>'
+    badge_data = scraping.BadgeData(
+        host='stackoverflow.com', badge_id=1974, instances=[
+            testing.make_badge(1, 100, badge_id=1974, reason_html=first),
+            testing.make_badge(2, 200, badge_id=1974, reason_html=first),
+            testing.make_badge(2, 300, badge_id=1974, reason_html=second),
+            testing.make_badge(3, 400, badge_id=1974, reason_html=second),
+        ])
+
+    index = analytics.UserIndex(badge_data)
+
+    assert index.all == {1, 2, 3}
+    assert index.by_reason == {first: {1, 2}, second: {2, 3}}
+    assert analytics.fraction_also_in(
+        index.by_reason[first], index.by_reason[second]) == 0.5
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+import concurrent.futures
+import gzip
+import logging
+import lzma
+import os
+import struct
+import zlib
+
+
+logger = logging.getLogger(__name__)
+
+
+class Codec(object):
+    """Compresses data as a series of independently-compressed blocks, using
+    a thread per block, and concatenates them.
+
+    Subclasses produce files that standard tools can read as a whole, but
+    that can also be split back into blocks to decompress in parallel.
+    """
+
+    name = None
+    extension = None
+    # Each thread compressing an xz block at the default level allocates an
+    # encoder of about 94MiB, however small the block, so using every CPU of
+    # a large machine could take gigabytes. Like `xz -T`, use fewer unless
+    # more are asked for.
+    MAX_DEFAULT_THREADS = 4
+
+    def __init__(self, level, block_size=2 * 1024 * 1024, threads=None):
+        self.level = level
+        self.block_size = block_size
+        self.threads = threads or min(
+            os.cpu_count() or 1, self.MAX_DEFAULT_THREADS)
+
+    def compress(self, data):
+        blocks = [
+            data[start:start + self.block_size]
+            for start in range(0, len(data), self.block_size)] or [b'']
+        return b''.join(self._map(self.compress_block, blocks))
+
+    def decompress(self, data):
+        blocks = self.split(data)
+        if blocks is None:
+            logger.debug(
+                "Can't split %s data, so using one thread.", self.name)
+            return self.decompress_all(data)
+        return b''.join(self._map(self.decompress_block, blocks))
+
+    def _map(self, function, blocks):
+        if self.threads == 1 or len(blocks) == 1:
+            return [function(block) for block in blocks]
+        # lzma and zlib release the GIL, so threads run in parallel.
+        with concurrent.futures.ThreadPoolExecutor(self.threads) as executor:
+            return list(executor.map(function, blocks))
+
+    def compress_block(self, block):
+        raise NotImplementedError()
+
+    def decompress_block(self, block):
+        raise NotImplementedError()
+
+    def decompress_all(self, data):
+        raise NotImplementedError()
+
+    def split(self, data):
+        """Returns the compressed blocks in data, or None if they can't be
+        found (for example, if it was written by another tool).
+        """
+        raise NotImplementedError()
+
+    def __repr__(self):
+        return (
+            '{0.__class__.__name__}(level={0.level!r}, '
+            'block_size={0.block_size!r})'.format(self))
+
+
+class XzCodec(Codec):
+    """Writes each block as a separate xz stream.
+
+    xz streams end with an index of their size, so the blocks can be found by
+    reading backwards from the end.
+    """
+
+    name = 'xz'
+    extension = '.xz'
+
+    def __init__(self, level=6, **kwargs):
+        super().__init__(level, **kwargs)
+
+    def compress_block(self, block):
+        return lzma.compress(block, format=lzma.FORMAT_XZ, preset=self.level)
+
+    def decompress_block(self, block):
+        return lzma.decompress(block, format=lzma.FORMAT_XZ)
+
+    def decompress_all(self, data):
+        return lzma.decompress(data)
+
+    def split(self, data):
+        blocks = []
+        end = len(data)
+
+        while end > 0:
+            # Streams may be followed by padding in multiples of four bytes.
+            while end >= 4 and data[end - 4:end] == b'\0\0\0\0':
+                end -= 4
+
+            if end < 24 or data[end - 2:end] != b'YZ':
+                return None
+            index_size = 4 * (
+                struct.unpack('<I', data[end - 8:end - 4])[0] + 1)
+            index_start = end - 12 - index_size
+            if index_start < 12:
+                return None
+
+            blocks_size = _xz_index_blocks_size(
+                data[index_start:index_start + index_size])
+            if blocks_size is None:
+                return None
+
+            start = index_start - blocks_size - 12
+            if start < 0 or data[start:start + 6] != b'\xfd7zXZ\0':
+                return None
+
+            blocks.append(data[start:end])
+            end = start
+
+        blocks.reverse()
+        return blocks
+
+
+def _xz_index_blocks_size(index):
+    """Returns the total size of the blocks listed in an xz stream index."""
+    if not index or index[0] != 0:
+        return None
+
+    position = 1
+    def read_integer():
+        nonlocal position
+        value = 0
+        for shift in range(0, 63, 7):
+            if position >= len(index):
+                raise ValueError("Truncated xz index.")
+            byte = index[position]
+            position += 1
+            value |= (byte & 0x7f) << shift
+            if not byte & 0x80:
+                return value
+        raise ValueError("Invalid xz index integer.")
+
+    try:
+        records = read_integer()
+        total = 0
+        for _ in range(records):
+            unpadded_size = read_integer()
+            read_integer()  # uncompressed size
+            total += (unpadded_size + 3) // 4 * 4
+    except ValueError:
+        return None
+
+    return total
+
+
+class GzipCodec(Codec):
+    """Writes each block as a separate gzip member.
+
+    Like BGZF, each member's header has an extra field with the size of the
+    member, so the blocks can be found without decompressing them.
+    """
+
+    name = 'gzip'
+    extension = '.gz'
+
+    # The extra field's subfield ID, followed by its length.
+    SUBFIELD = b'BS\x04\x00'
+
+    def __init__(self, level=6, **kwargs):
+        super().__init__(level, **kwargs)
+
+    def compress_block(self, block):
+        compressor = zlib.compressobj(
+            self.level, zlib.DEFLATED, -zlib.MAX_WBITS)
+        deflated = compressor.compress(block) + compressor.flush()
+
+        header_size = 10 + 2 + len(self.SUBFIELD) + 4
+        member_size = header_size + len(deflated) + 8
+
+        return b''.join([
+            # Magic, deflate, FEXTRA, no mtime, no flags, unknown OS.
+            b'\x1f\x8b\x08\x04\0\0\0\0\0\xff',
+            struct.pack('<H', len(self.SUBFIELD) + 4),
+            self.SUBFIELD,
+            struct.pack('<I', member_size),
+            deflated,
+            struct.pack('<II', zlib.crc32(block), len(block) & 0xffffffff),
+        ])
+
+    def decompress_block(self, block):
+        return gzip.decompress(block)
+
+    def decompress_all(self, data):
+        return gzip.decompress(data)
+
+    def split(self, data):
+        blocks = []
+        start = 0
+        subfield_start = 12
+        subfield_end = subfield_start + len(self.SUBFIELD)
+
+        while start < len(data):
+            header = data[start:start + subfield_end + 4]
+            if (len(header) < subfield_end + 4 or
+                    header[:4] != b'\x1f\x8b\x08\x04' or
+                    header[subfield_start:subfield_end] != self.SUBFIELD):
+                return None
+
+            member_size = struct.unpack('<I', header[subfield_end:])[0]
+            if start + member_size > len(data):
+                return None
+
+            blocks.append(data[start:start + member_size])
+            start += member_size
+
+        return blocks
+
+
+CODECS = [XzCodec, GzipCodec]
+
+
+def codec_for_path(path):
+    """Returns a default codec for a path's extension."""
+    for codec in CODECS:
+        if path.endswith(codec.extension):
+            return codec()
+    raise ValueError("Unknown compression extension: {!r}".format(path))
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+import glob
+import json
+import logging
+import os
+import sys
+import time
+
+import compression
+import storage
+
+
+logger = logging.getLogger(__name__)
+
+
+CONFIGURATIONS = [
+    compression.XzCodec(level=6, block_size=1 << 40, threads=1),
+    compression.XzCodec(level=6, block_size=4 << 20),
+    compression.XzCodec(level=6, block_size=1 << 20),
+    compression.XzCodec(level=9, block_size=4 << 20),
+    compression.XzCodec(level=1, block_size=1 << 20),
+    compression.GzipCodec(level=6, block_size=1 << 20),
+    compression.GzipCodec(level=9, block_size=1 << 20),
+]
+
+
+def benchmark(path_bases, configurations=CONFIGURATIONS):
+    """Compares the size and speed of codec configurations on data files, as
+    they'd be written by storage.write_badge_data().
+
+    Returns a list of (path_base, codec, size, compress_seconds,
+    decompress_seconds) tuples.
+    """
+    results = []
+
+    for path_base in path_bases:
+        data = json.dumps(
+            storage.read_badge_data(path_base).to_json()).encode('utf-8')
+
+        for codec in configurations:
+            start = time.time()
+            compressed = codec.compress(data)
+            compress_seconds = time.time() - start
+
+            start = time.time()
+            assert codec.decompress(compressed) == data
+            decompress_seconds = time.time() - start
+
+            results.append((
+                path_base, codec, len(compressed),
+                compress_seconds, decompress_seconds))
+
+    return results
+
+
+def main(*path_bases):
+    logging.basicConfig(level=logging.INFO)
+
+    path_bases = path_bases or sorted(
+        path[:-len('.json.xz')] for path in glob.glob('data/*.json.xz'))
+
+    print("{} CPUs".format(os.cpu_count()))
+    print("{:<32} {:<42} {:>9} {:>9} {:>10}".format(
+        "data", "codec", "bytes", "compress", "decompress"))
+    for path_base, codec, size, compress_seconds, decompress_seconds in (
+            benchmark(path_bases)):
+        print("{:<32} {:<42} {:>9} {:>8.3f}s {:>9.3f}s".format(
+            os.path.basename(path_base), repr(codec), size,
+            compress_seconds, decompress_seconds))
+
+
+if __name__ == '__main__':
+    sys.exit(main(*sys.argv[1:]))
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+import gzip
+import logging
+import lzma
+
+import pytest
+
+import compression
+
+
+logger = logging.getLogger(__name__)
+
+
+DATA = b''.join(
+    '{{"user_id": {}, "rep": {}}}\n'.format(i, i * 7 % 1000).encode('utf-8')
+    for i in range(20000))
+
+
+@pytest.mark.parametrize('codec_class', compression.CODECS)
+@pytest.mark.parametrize('block_size', [1000, 64 * 1024, 10 * 1024 * 1024])
+def test_round_trip(codec_class, block_size):
+    codec = codec_class(level=1, block_size=block_size, threads=4)
+    compressed = codec.compress(DATA)
+
+    blocks = codec.split(compressed)
+    assert len(blocks) == -(-len(DATA) // block_size)
+    assert codec.decompress(compressed) == DATA
+
+
+@pytest.mark.parametrize('codec_class', compression.CODECS)
+def test_empty_round_trip(codec_class):
+    codec = codec_class(level=1)
+    assert codec.decompress(codec.compress(b'')) == b''
+
+
+@pytest.mark.parametrize('codec_class, decompress', [
+    (compression.XzCodec, lzma.decompress),
+    (compression.GzipCodec, gzip.decompress),
+])
+def test_output_is_readable_by_standard_tools(codec_class, decompress):
+    compressed = codec_class(level=1, block_size=1000).compress(DATA)
+    assert decompress(compressed) == DATA
+
+
+@pytest.mark.parametrize('codec_class, compress', [
+    (compression.XzCodec, lzma.compress),
+    (compression.GzipCodec, gzip.compress),
+])
+def test_reads_data_written_by_standard_tools(codec_class, compress):
+    codec = codec_class()
+    compressed = compress(DATA)
+    if codec_class is compression.GzipCodec:
+        # Without the block size field, the members can't be found.
+        assert codec.split(compressed) is None
+    assert codec.decompress(compressed) == DATA
+
+
+def test_default_threads_are_limited():
+    codec = compression.XzCodec()
+    assert 1 <= codec.threads <= compression.Codec.MAX_DEFAULT_THREADS
+    assert compression.XzCodec(threads=16).threads == 16
+
+
+def test_codec_for_path():
+    assert isinstance(
+        compression.codec_for_path('data/x.json.xz'), compression.XzCodec)
+    assert isinstance(
+        compression.codec_for_path('data/x.json.gz'), compression.GzipCodec)
+    with pytest.raises(ValueError):
+        compression.codec_for_path('data/x.json.bz2')
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+import logging
+import os
+import sys
+import xml.etree.ElementTree
+
+import election_observer
+import scraping
+import sharding
+import storage
+
+
+logger = logging.getLogger(__name__)
+
+
+# The names of the badges in sharding.DEFAULT_JOBS, which is how they're
+# identified in the data dump.
+BADGE_NAMES = {
+    'sheriff': 'Sheriff',
+    'constituent': 'Constituent',
+    'great-answers': 'Great Answer',
+    'caucus': 'Caucus',
+}
+# Badges that election_observer.py groups by the election in their reason.
+# The dump doesn't record reasons, and update() never scrapes awards older
+# than the dump, so these would never be attributed to their elections.
+# They aren't imported.
+REASON_DEPENDENT_BADGES = {'constituent', 'caucus'}
+
+
+def timestamp_from_dump_date(s):
+    """Returns the unix timestamp for a data dump date/time, such as
+    '2008-09-15T08:55:03.923', ignoring the fraction of a second.
+    """
+    if len(s) < 19 or s[10] != 'T':
+        raise ValueError("Not a data dump date/time: {!r}".format(s))
+    return scraping.timestamp_from_iso1608('{} {}Z'.format(s[:10], s[11:19]))
+
+
+def iter_rows(source):
+    """Yields the attributes of each <row> in a data dump XML file (a path or
+    a binary file object).
+
+    The file is parsed incrementally and each row is discarded once it has
+    been yielded, so memory use doesn't grow with the size of the file.
+    """
+    events = xml.etree.ElementTree.iterparse(source, events=('start', 'end'))
+    _, root = next(events)
+
+    for event, element in events:
+        if event == 'end' and element.tag == 'row':
+            yield element.attrib
+            root.clear()
+
+
+def read_badge_data(source, host, badge_names):
+    """Reads every award of some badges from a data dump's Badges.xml.
+
+    badge_names maps the id of each badge on host to its name. Returns a dict
+    mapping each of those ids to a BadgeData, whose complete_until is the
+    time of the latest award of any badge in the dump, so that update() will
+    only scrape awards newer than the dump.
+
+    The dump doesn't include award reasons (such as the election a
+    Constituent badge was for), usernames, reputation or badge counts, so
+    imported badges have None or 0 for those.
+    """
+    badge_ids_by_name = {
+        name: badge_id for badge_id, name in badge_names.items()}
+    instances = {badge_id: [] for badge_id in badge_names}
+    latest_date = None
+    row_count = 0
+
+    for row in iter_rows(source):
+        row_count += 1
+        # The dates are all in the same format, so the latest sorts last.
+        date = row['Date']
+        if latest_date is None or date > latest_date:
+            latest_date = date
+
+        badge_id = badge_ids_by_name.get(row['Name'])
+        if badge_id is None or row.get('TagBased') == 'True':
+            continue
+
+        badge = scraping.Badge(badge_id=badge_id)
+        badge.reason_html = None
+        badge.user_id = int(row['UserId'])
+        badge.timestamp = timestamp_from_dump_date(date)
+        badge.username_html = None
+        badge.rep = 0
+        badge.gold = 0
+        badge.silver = 0
+        badge.bronze = 0
+        instances[badge_id].append(badge)
+
+    logger.info(
+        "Read %s awards of %s badges from %s rows.",
+        sum(map(len, instances.values())), len(badge_names), row_count)
+
+    all_badge_data = {}
+    for badge_id, badges in instances.items():
+        badge_data = scraping.BadgeData(
+            host=host, badge_id=badge_id, instances=badges)
+        if latest_date is not None:
+            badge_data.complete_until = timestamp_from_dump_date(latest_date)
+        all_badge_data[badge_id] = badge_data
+
+    return all_badge_data
+
+
+def main(badges_path, host, *args):
+    flags = set(args)
+
+    directory = 'data'
+    for flag in list(flags):
+        if flag.startswith('--output='):
+            directory = flag.partition('=')[2]
+            flags.remove(flag)
+
+    assert not flags - {'-f', '--force'}
+    force = bool(flags.intersection(['-f', '--force']))
+
+    logging.basicConfig(level=logging.INFO)
+
+    jobs = [job for job in sharding.DEFAULT_JOBS if job.host == host]
+    if not jobs:
+        logger.error("No badges are tracked for %s.", host)
+        return 1
+
+    for job in jobs:
+        if job.name in REASON_DEPENDENT_BADGES:
+            logger.info(
+                "Not importing %s badges, which need their reasons.", job.name)
+    jobs = [job for job in jobs if job.name not in REASON_DEPENDENT_BADGES]
+    if not jobs:
+        logger.error("No badges can be imported for %s.", host)
+        return 1
+
+    with open(badges_path, 'rb') as f:
+        all_badge_data = read_badge_data(
+            f, host, {job.badge_id: BADGE_NAMES[job.name] for job in jobs})
+
+    os.makedirs(directory, exist_ok=True)
+    for job in jobs:
+        filename = '{}-{}'.format(host, job.name)
+        path_base = os.path.join(directory, filename)
+        try:
+            existing_path = storage.badge_data_file_path(path_base)
+        except FileNotFoundError:
+            pass
+        else:
+            if not force:
+                logger.warning(
+                    "Not replacing %s without --force.", existing_path)
+                continue
+
+        # Written the same way election_observer.py writes it.
+        codec = election_observer.DATA_CODECS.get(
+            filename, election_observer.DEFAULT_DATA_CODEC)
+        path = path_base + '.json' + codec.extension
+        badge_data = all_badge_data[job.badge_id]
+        storage.write_badge_data(path, badge_data, codec)
+        logger.info("Wrote %s badges to %s.", len(badge_data), path)
+
+
+if __name__ == '__main__':
+    sys.exit(main(*sys.argv[1:]))
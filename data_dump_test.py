@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+import logging
+
+import pytest
+
+import data_dump
+import election_observer
+import scraping
+import storage
+import synthetic
+
+
+logger = logging.getLogger(__name__)
+
+
+SAMPLE_BADGES_XML = '''\
+<?xml version="1.0" encoding="utf-8"?>
+<badges>
+  <row Id="1" UserId="10" Name="Constituent" Date="2015-11-24T20:00:01.123" Class="3" TagBased="False" />
+  <row Id="2" UserId="11" Name="Teacher" Date="2015-11-24T20:00:02.000" Class="3" TagBased="False" />
+  <row Id="3" UserId="12" Name="Constituent" Date="2015-11-25T08:30:00.997" Class="3" TagBased="False" />
+  <row Id="4" UserId="10" Name="Caucus" Date="2015-11-17T20:00:05.000" Class="3" TagBased="False" />
+  <row Id="5" UserId="13" Name="Constituent" Date="2016-01-02T00:00:00.000" Class="3" TagBased="True" />
+  <row Id="6" UserId="14" Name="Supporter" Date="2016-03-01T12:34:56.789" Class="3" TagBased="False" />
+  <row Id="7" UserId="15" Name="Sheriff" Date="2015-12-01T00:00:00.000" Class="1" TagBased="False" />
+</badges>
+'''
+
+
+def test_timestamp_from_dump_date():
+    assert data_dump.timestamp_from_dump_date('2008-09-15T08:55:03.923') == (
+        scraping.timestamp_from_iso1608('2008-09-15 08:55:03Z'))
+    with pytest.raises(ValueError):
+        data_dump.timestamp_from_dump_date('2008-09-15 08:55:03Z')
+
+
+def test_read_badge_data(tmpdir):
+    path = tmpdir.join('Badges.xml')
+    path.write(SAMPLE_BADGES_XML)
+
+    all_badge_data = data_dump.read_badge_data(
+        str(path), 'stackoverflow.com', {1974: 'Constituent', 1973: 'Caucus'})
+
+    constituents = all_badge_data[1974]
+    assert [(badge.user_id, badge.stack_time) for badge in constituents] == [
+        (10, '2015-11-24 20:00:01Z'),
+        (12, '2015-11-25 08:30:00Z'),
+    ]
+    assert [badge.user_id for badge in all_badge_data[1973]] == [10]
+
+    # The latest award of any badge marks the end of the dump.
+    assert constituents.complete_until == (
+        scraping.timestamp_from_iso1608('2016-03-01 12:34:56Z'))
+
+
+def test_update_only_scrapes_awards_newer_than_dump(tmpdir):
+    path = tmpdir.join('Badges.xml')
+    path.write(SAMPLE_BADGES_XML)
+    badge_data = data_dump.read_badge_data(
+        str(path), 'stackoverflow.com', {1974: 'Constituent'})[1974]
+
+    def scraped_badge(user_id, stack_time):
+        badge = scraping.Badge(badge_id=1974)
+        badge.reason_html = '<a href="/election/7">2015 Moderator Election</a>'
+        badge.user_id = user_id
+        badge.timestamp = scraping.timestamp_from_iso1608(stack_time)
+        badge.username_html = 'user{}'.format(user_id)
+        badge.rep = badge.gold = badge.silver = badge.bronze = 1
+        return badge
+
+    scraped = [
+        scraped_badge(20, '2016-04-01 00:00:00Z'),
+        scraped_badge(21, '2016-03-05 00:00:00Z'),
+        # These are already in the dump, though without their reasons.
+        scraped_badge(12, '2015-11-25 08:30:00Z'),
+        scraped_badge(10, '2015-11-24 20:00:01Z'),
+    ]
+    badge_data._scrape_all_badges = lambda: iter(scraped)
+    badge_data.update()
+
+    assert [badge.user_id for badge in badge_data] == [10, 12, 21, 20]
+
+    # complete_until survives being written and read back.
+    storage.write_badge_data(str(tmpdir.join('data.json.xz')), badge_data)
+    reloaded = storage.read_badge_data(str(tmpdir.join('data')))
+    assert reloaded.complete_until == badge_data.complete_until
+    assert len(reloaded) == 4
+
+
+def test_main_leaves_election_badges_for_the_observer(tmpdir):
+    tmpdir.join('Badges.xml').write(SAMPLE_BADGES_XML)
+    tmpdir.mkdir('images')
+    data = tmpdir.mkdir('data')
+
+    # Constituent and Caucus badges scraped with their reasons, as
+    # election_observer.py would have written them.
+    scraped = synthetic.generate_elections(
+        'stackoverflow.com', election_count=3, voters_per_election=20)
+    for badge_data, name in zip(scraped, ['constituent', 'caucus']):
+        storage.write_badge_data(
+            str(data.join('stackoverflow.com-{}.json.xz'.format(name))),
+            badge_data)
+
+    with tmpdir.as_cwd():
+        data_dump.main('Badges.xml', 'stackoverflow.com', '--force')
+
+        assert [badge.user_id for badge in storage.read_badge_data(
+            'data/stackoverflow.com-sheriff')] == [15]
+        assert len(storage.read_badge_data(
+            'data/stackoverflow.com-great-answers')) == 0
+
+        constituents = storage.read_badge_data(
+            'data/stackoverflow.com-constituent')
+        caucus = storage.read_badge_data('data/stackoverflow.com-caucus')
+        assert len(constituents) == len(scraped[0])
+        assert len(caucus) == len(scraped[1])
+
+        # Every badge can still be attributed to its election and charted.
+        constituents_by_reason = election_observer.by_election(constituents)
+        caucus_by_reason = election_observer.by_election(caucus)
+        elections = {}
+        for reason, badges in constituents_by_reason.items():
+            election = election_observer.ElectionData(
+                host='stackoverflow.com',
+                constituent_badges=badges,
+                caucus_badges=caucus_by_reason[reason])
+            elections[election.id] = election
+            election.hello_graphs()
+        election_observer.conversion_and_retention_graphs(
+            'stackoverflow.com', elections)
+
+    assert sorted(elections) == [1, 2, 3]
+    assert sum(
+        len(election.constituent_badges)
+        for election in elections.values()) == len(scraped[0])
+    assert tmpdir.join(
+        'images', 'elections-stackoverflow.com-conversion.svg').check()
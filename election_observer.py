@@ -1,18 +1,22 @@
 #!/usr/bin/env python3
 import csv
-import lzma
-import bz2
-import gzip
-import json
+import functools
 import logging
 import math
+import operator
 import os
+import shutil
 import sys
 import time
 
 import pygal
 
+import analytics
+import compression
+import events
+import profiling
 import scraping
+import storage
 
 
 logger = logging.getLogger(__name__)
@@ -39,6 +43,9 @@ class ElectionData(object):
             .partition('"')[0])
         self.constituent_badges = constituent_badges
         self.caucus_badges = caucus_badges
+        self.constituent_users = analytics.UserSet.from_badges(
+            constituent_badges)
+        self.caucus_users = analytics.UserSet.from_badges(caucus_badges)
 
         if caucus_badges:
             self.start_timestamp = self.caucus_badges[0].timestamp
@@ -150,10 +157,39 @@ class ElectionData(object):
         logger.info("Wrote {}.".format(filename))
 
 
+SPILL_DIRECTORY = 'data/spill'
+EVENTS_DIRECTORY = 'data/events'
+PROFILES_DIRECTORY = 'profiles'
+
+# How each data file is compressed. See compression_benchmark.py for the
+# trade-offs. The large constituent and caucus files are rewritten often
+# during elections, so they're split into smaller blocks to compress on more
+# threads, which costs very little space.
+DEFAULT_DATA_CODEC = compression.XzCodec(level=6)
+DATA_CODECS = {
+    'stackoverflow.com-constituent': compression.XzCodec(
+        level=6, block_size=1024 * 1024),
+    'stackoverflow.com-caucus': compression.XzCodec(
+        level=6, block_size=1024 * 1024),
+}
+
+
 def main(*args):
     flags = set(args)
+
+    memory_budget = None
+    profile_iterations = None
+    for flag in list(flags):
+        if flag.startswith('--memory-budget='):
+            memory_budget = int(flag.partition('=')[2])
+            flags.remove(flag)
+        elif flag.startswith('--profile='):
+            profile_iterations = int(flag.partition('=')[2])
+            flags.remove(flag)
+
     assert not flags - {
-        '-n', '--no-update', '-e', '--forever', '-m', '--no-write' }
+        '-n', '--no-update', '-e', '--forever', '-m', '--no-write',
+        '--event-log', '--profile-memory' }
 
     os.makedirs('data', exist_ok=True)
     os.makedirs('images', exist_ok=True)
@@ -167,20 +203,71 @@ def main(*args):
                '\n'
                '%(message)s')
 
-    so_sheriffs, write_sherrifs = get_badge_data_and_write_function(
-        host='stackoverflow.com', badge_id=3109, filename='sheriff')
-    so_constituents, write_constituents = get_badge_data_and_write_function(
-        host='stackoverflow.com', badge_id=1974, filename='constituent')
-    so_great_answers, write_great_answers = get_badge_data_and_write_function(
-        host='stackoverflow.com', badge_id=25, filename='great-answers')
-    so_caucus, write_caucus = get_badge_data_and_write_function(
-        host='stackoverflow.com', badge_id=1973, filename='caucus')
-    math_constituents, write_math_constituents = get_badge_data_and_write_function(
-        host='math.stackexchange.com', badge_id=208, filename='constituent')
-    math_caucus, write_math_caucus = get_badge_data_and_write_function(
-        host='math.stackexchange.com', badge_id=207, filename='caucus')
+    if memory_budget is not None:
+        os.makedirs(SPILL_DIRECTORY, exist_ok=True)
+
+    profiler = profiling.Profiler(
+        directory=PROFILES_DIRECTORY,
+        iterations=profile_iterations or 1,
+        memory='--profile-memory' in flags)
+    profiler.install_signal_handler()
+    if profile_iterations:
+        profiler.request(profile_iterations)
+
+    writer = storage.BackgroundWriter(profiler=profiler)
+    try:
+        _observe(flags, writer, memory_budget, profiler)
+    finally:
+        logger.info("Waiting for pending writes to finish.")
+        writer.close()
+        if memory_budget is not None:
+            shutil.rmtree(SPILL_DIRECTORY, ignore_errors=True)
+
+
+def _observe(flags, writer, memory_budget=None, profiler=None):
+    if profiler is None:
+        profiler = profiling.Profiler()
+
+    (
+        (so_sheriffs, write_sherrifs),
+        (so_constituents, write_constituents),
+        (so_great_answers, write_great_answers),
+        (so_caucus, write_caucus),
+        (math_constituents, write_math_constituents),
+        (math_caucus, write_math_caucus),
+    ) = get_all_badge_data_and_write_functions([
+        ('stackoverflow.com', 3109, 'sheriff'),
+        ('stackoverflow.com', 1974, 'constituent'),
+        ('stackoverflow.com', 25, 'great-answers'),
+        ('stackoverflow.com', 1973, 'caucus'),
+        ('math.stackexchange.com', 208, 'constituent'),
+        ('math.stackexchange.com', 207, 'caucus'),
+    ], writer=writer)
+
+    if memory_budget is not None:
+        for badge_data in [
+            so_sheriffs, so_constituents, so_great_answers, so_caucus,
+            math_constituents, math_caucus
+        ]:
+            badge_data.set_memory_budget(memory_budget, SPILL_DIRECTORY)
+
+    if '--event-log' in flags:
+        os.makedirs(EVENTS_DIRECTORY, exist_ok=True)
+        for badge_data, filename in [
+            (so_sheriffs, 'sheriff'),
+            (so_constituents, 'constituent'),
+            (so_great_answers, 'great-answers'),
+            (so_caucus, 'caucus'),
+            (math_constituents, 'constituent'),
+            (math_caucus, 'caucus'),
+        ]:
+            badge_data.event_log = events.EventLog(
+                '{}/{}-{}.jsonl'.format(
+                    EVENTS_DIRECTORY, badge_data.host, filename))
 
     while True:
+        profiler.start_iteration()
+
         if not flags.intersection(['-n', '--no-update']):
             so_sheriffs.update()
             so_great_answers.update()
@@ -191,10 +278,10 @@ def main(*args):
             math_caucus.update()
 
         logger.info("Grouping constituents by election.")
-        constituents_by_reason = so_constituents.by_reason()
+        constituents_by_reason = by_election(so_constituents)
         
         logger.info("Grouping caucuses by election.")
-        caucus_by_reason = so_caucus.by_reason()
+        caucus_by_reason = by_election(so_caucus)
 
         elections = {}
 
@@ -437,13 +524,15 @@ def main(*args):
         logger.info("Wrote {}.".format(filename))
         
 
+        conversion_and_retention_graphs('stackoverflow.com', elections)
+
         # MATH ELECTION COMPARISON
 
         logger.info("Grouping math constituents by election.")
-        constituents_by_reason = math_constituents.by_reason()
+        constituents_by_reason = by_election(math_constituents)
         
         logger.info("Grouping math caucuses by election.")
-        caucus_by_reason = math_caucus.by_reason()
+        caucus_by_reason = by_election(math_caucus)
 
         math_elections = {}
         for reason in list(sorted(constituents_by_reason))[-3:]:
@@ -455,6 +544,9 @@ def main(*args):
             math_elections[election.id] = election
             election.hello_graphs()
 
+        conversion_and_retention_graphs(
+            'math.stackexchange.com', math_elections)
+
         filename = 'images/math-comparison-both-cumulative.svg'
         logger.info("Generating {}.".format(filename))
 
@@ -490,6 +582,11 @@ def main(*args):
             write_sherrifs()
             write_great_answers()
 
+        if profiler.active:
+            # Include the background writes in the profile.
+            writer.flush()
+        profiler.finish_iteration()
+
         if not flags.intersection(['-e', '--forever']):
             break
 
@@ -497,6 +594,90 @@ def main(*args):
         time.sleep(60 * 5)
 
 
+def conversion_and_retention_graphs(host, elections):
+    """Charts how many Caucus recipients (eligible viewers) went on to vote
+    in each election, and how many voters voted again in the next one."""
+
+    election_ids = sorted(elections)
+
+    filename = 'images/elections-{}-conversion.svg'.format(host)
+    logger.info("Generating {}.".format(filename))
+
+    chart = pygal.Bar(
+        title="{} Election Viewers Who Voted".format(host),
+        y_title="Users",
+        x_title="Election",
+        width=1024,
+        height=768,
+        value_formatter=lambda n: str(int(n)),
+        legend_at_bottom=True)
+
+    chart.x_labels = [str(election_id) for election_id in election_ids]
+    chart.add('eligible viewers', [
+        len(elections[election_id].caucus_users)
+        for election_id in election_ids])
+    chart.add('viewers who voted', [
+        len(elections[election_id].caucus_users &
+            elections[election_id].constituent_users)
+        for election_id in election_ids])
+    chart.add('voters', [
+        len(elections[election_id].constituent_users)
+        for election_id in election_ids])
+
+    chart.render_to_file(filename)
+    logger.info("Wrote {}.".format(filename))
+
+    filename = 'images/elections-{}-retention.svg'.format(host)
+    logger.info("Generating {}.".format(filename))
+
+    chart = pygal.Bar(
+        title="{} Voters Who Voted Again In The Next Election".format(host),
+        y_title="Percent of voters",
+        x_title="Election",
+        width=1024,
+        height=768,
+        range=(0, 100),
+        value_formatter=lambda n: '{:.1f}%'.format(n),
+        legend_at_bottom=True)
+
+    consecutive_ids = list(zip(election_ids, election_ids[1:]))
+    chart.x_labels = [
+        '{} to {}'.format(election_id, next_election_id)
+        for election_id, next_election_id in consecutive_ids]
+    chart.add('voted again', [
+        100 * analytics.fraction_also_in(
+            elections[election_id].constituent_users,
+            elections[next_election_id].constituent_users)
+        for election_id, next_election_id in consecutive_ids])
+    chart.add('voted in any later election', [
+        100 * analytics.fraction_also_in(
+            elections[election_id].constituent_users,
+            functools.reduce(
+                operator.or_,
+                (elections[later_id].constituent_users
+                 for later_id in election_ids[index + 1:]),
+                analytics.UserSet()))
+        for index, (election_id, _) in enumerate(consecutive_ids)])
+
+    chart.render_to_file(filename)
+    logger.info("Wrote {}.".format(filename))
+
+
+def by_election(badge_data):
+    """Groups election badges by their reason, which links to the election.
+
+    Badges without a reason, such as those imported from a data dump by
+    data_dump.py, can't be attributed to an election, so they're left out.
+    """
+    badges_by_reason = badge_data.by_reason()
+    unknown = badges_by_reason.pop(None, [])
+    if unknown:
+        logger.info(
+            "Skipping {} {} badges on {} without an election.".format(
+                len(unknown), badge_data.badge_id, badge_data.host))
+    return badges_by_reason
+
+
 def cumulative(xs):
     n = 0
     for x in xs:
@@ -505,37 +686,82 @@ def cumulative(xs):
 
 
 def get_badge_data_and_write_function(
-    host, badge_id, filename, require_file=False
+    host, badge_id, filename, require_file=False, writer=None
 ):
+    """Loads the data file for a badge, returning the BadgeData and a function
+    that writes it back if it has changed since it was loaded or last written.
+
+    If a storage.BackgroundWriter is given, writes are handed off to it instead
+    of blocking the caller.
+    """
     filename = host + '-' + filename
     logger.info("Loading {} badges...".format(filename))
 
     try:
-        f = lzma.open('data/' + filename + '.json.xz', 'rt') 
+        badge_data = storage.read_badge_data('data/' + filename)
     except FileNotFoundError:
-        try:
-            f = open('data/' + filename + '.json', 'rt') 
-        except FileNotFoundError:
-            if not require_file:
-                f = None
-            else:
-                raise
-
-    if f:
-        with f:
-            badge_data = scraping.BadgeData.from_json(json.load(f))
-    else:
+        if require_file:
+            raise
         badge_data = scraping.BadgeData(host=host, badge_id=badge_id)
 
     logger.info("...{} {} badges loaded.".format(len(badge_data), filename))
 
+    return badge_data, _write_function(badge_data, filename, writer)
+
+
+def get_all_badge_data_and_write_functions(badges, writer=None):
+    """Like get_badge_data_and_write_function, for a list of (host, badge_id,
+    filename) tuples, but decoding their data files in parallel.
+
+    Returns a list of (BadgeData, write function) pairs in the same order.
+    """
+    filenames = [host + '-' + filename for host, _, filename in badges]
+    logger.info("Loading {} badge data files...".format(len(filenames)))
+
+    loaded = storage.load_badge_data_in_parallel(
+        'data/' + filename for filename in filenames)
+
+    results = []
+    for (host, badge_id, _), filename in zip(badges, filenames):
+        badge_data = loaded['data/' + filename]
+        if badge_data is None:
+            badge_data = scraping.BadgeData(host=host, badge_id=badge_id)
+
+        logger.info(
+            "...{} {} badges loaded.".format(len(badge_data), filename))
+        results.append(
+            (badge_data, _write_function(badge_data, filename, writer)))
+
+    return results
+
+
+def _write_function(badge_data, filename, writer):
+    # Only advanced once a write has succeeded, so that failed writes are
+    # retried next time.
+    written_generation = badge_data.generation
+
+    def written(generation):
+        nonlocal written_generation
+        written_generation = max(written_generation, generation)
+
     def write():
+        if badge_data.generation == written_generation:
+            logger.info("No new {} badges to write.".format(filename))
+            return
+
+        codec = DATA_CODECS.get(filename, DEFAULT_DATA_CODEC)
+        path = 'data/' + filename + '.json' + codec.extension
+        if writer is not None:
+            writer.submit(path, badge_data, codec, on_written=written)
+            return
+
+        generation = badge_data.generation
         logger.info("Writing {} {} badges...".format(len(badge_data), filename))
-        with lzma.open('data/' + filename + '.json.xz', 'wt') as f:
-            json.dump(badge_data.to_json(), f)
+        storage.write_badge_data(path, badge_data, codec)
+        written(generation)
         logger.info("...wrote {} {} badges.".format(len(badge_data), filename))
 
-    return badge_data, write
+    return write
 
 
 if __name__ == '__main__':
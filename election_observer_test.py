@@ -4,6 +4,8 @@ import logging
 import pytest
 
 import election_observer
+import scraping
+import testing
 
 
 logger = logging.getLogger(__name__)
@@ -16,3 +18,63 @@ def test_get_publicist_and_have_publicist():
             filename='sheriff', require_file=True))
 
     assert any(badge.user_id == 102937 for badge in so_publicist)
+
+
+def test_by_election_skips_badges_without_a_reason(caplog):
+    reason_html = 'for an <a href="/election/6">election</a>'
+    badge_data = scraping.BadgeData(
+        host='math.stackexchange.com', badge_id=208, instances=[
+            testing.make_badge(1, 100, badge_id=208),
+            testing.make_badge(2, 200, badge_id=208, reason_html=reason_html),
+            testing.make_badge(3, 300, badge_id=208, reason_html=reason_html),
+        ])
+
+    with caplog.at_level(logging.INFO):
+        badges_by_election = election_observer.by_election(badge_data)
+
+    assert sorted(badges_by_election) == [reason_html]
+    assert "Skipping 1 208 badges on math.stackexchange.com" in caplog.text
+    election = election_observer.ElectionData(
+        host='math.stackexchange.com',
+        constituent_badges=badges_by_election[reason_html],
+        caucus_badges=[])
+    assert election.id == 6
+    assert election.constituent_users == {2, 3}
+
+
+class RecordingWriter(object):
+    """Stands in for a storage.BackgroundWriter, without writing anything."""
+
+    def __init__(self):
+        self.submissions = []
+
+    def submit(self, path, badge_data, codec=None, on_written=None):
+        self.submissions.append((path, badge_data.generation, on_written))
+
+
+def test_write_function_only_writes_changed_data():
+    badge_data = scraping.BadgeData(host='stackoverflow.com', badge_id=3109)
+    writer = RecordingWriter()
+    write = election_observer._write_function(
+        badge_data, 'stackoverflow.com-sheriff', writer)
+
+    write()
+    assert writer.submissions == []
+
+    badge_data.generation += 1
+    write()
+    assert len(writer.submissions) == 1
+
+    # That write failed, so on_written wasn't called. It's submitted again.
+    write()
+    assert len(writer.submissions) == 2
+    path, generation, on_written = writer.submissions[-1]
+    assert path == 'data/stackoverflow.com-sheriff.json.xz'
+
+    on_written(generation)
+    write()
+    assert len(writer.submissions) == 2
+
+    badge_data.generation += 1
+    write()
+    assert len(writer.submissions) == 3
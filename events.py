@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+import json
+import logging
+import os
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+class EventLog(object):
+    """An append-only JSON Lines file of newly-scraped badges.
+
+    Assign one to a BadgeData's event_log and update() will append an event
+    for every new badge it finds. Events are buffered and written out with a
+    single fsync once there are batch_size of them, once the oldest has been
+    waiting for max_delay_seconds, or when update() finishes.
+    """
+
+    logger = logging.getLogger(__name__).getChild('EventLog')
+
+    def __init__(self, path, batch_size=100, max_delay_seconds=1.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.max_delay_seconds = max_delay_seconds
+        self._buffer = []
+        self._buffer_start_time = None
+
+    def append(self, badge_data, badge):
+        event = {
+            'host': badge_data.host,
+            'badge_id': badge_data.badge_id,
+            'observed_timestamp': int(time.time()),
+            'badge': badge.to_json(),
+        }
+        if not self._buffer:
+            self._buffer_start_time = time.time()
+        self._buffer.append(
+            json.dumps(event, sort_keys=True).encode('utf-8') + b'\n')
+
+        if (len(self._buffer) >= self.batch_size or
+                time.time() - self._buffer_start_time >=
+                self.max_delay_seconds):
+            self.flush()
+
+    def flush(self):
+        """Writes and fsyncs any buffered events."""
+        if not self._buffer:
+            return
+
+        with open(self.path, 'ab') as f:
+            f.write(b''.join(self._buffer))
+            f.flush()
+            os.fsync(f.fileno())
+
+        self.logger.debug(
+            "Wrote %s events to %s.", len(self._buffer), self.path)
+        self._buffer = []
+        self._buffer_start_time = None
+
+
+class EventLogReader(object):
+    """Reads the events from an EventLog file, starting at a byte offset.
+
+    offset always points just past the last complete event that has been
+    read, so it can be saved and used to resume reading later.
+    """
+
+    def __init__(self, path, offset=0):
+        self.path = path
+        self.offset = offset
+
+    def read(self):
+        """Returns a list of all complete events written since the last read.
+        """
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(self.offset)
+                data = f.read()
+        except FileNotFoundError:
+            return []
+
+        # A partially-written last line will be complete next time.
+        complete = data[:data.rfind(b'\n') + 1]
+        self.offset += len(complete)
+
+        return [
+            json.loads(line.decode('utf-8'))
+            for line in complete.splitlines() if line]
+
+    def follow(self, poll_interval_seconds=1.0):
+        """Yields events forever, polling the file for new ones."""
+        while True:
+            yield from self.read()
+            time.sleep(poll_interval_seconds)
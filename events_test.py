@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+import logging
+
+import events
+import scraping
+import testing
+
+
+logger = logging.getLogger(__name__)
+
+
+def test_update_appends_new_badges_to_event_log(tmpdir):
+    path = str(tmpdir.join('sheriff.jsonl'))
+    badges = [testing.make_badge(user_id=n, timestamp=n * 60) for n in range(1, 6)]
+
+    badge_data = scraping.BadgeData(
+        host='stackoverflow.com', badge_id=3109, instances=badges[:2])
+    badge_data.event_log = events.EventLog(path, batch_size=2)
+    badge_data._scrape_all_badges = lambda: reversed(badges)
+
+    reader = events.EventLogReader(path)
+    assert reader.read() == []
+
+    badge_data.update()
+
+    read = reader.read()
+    assert [event['badge']['user_id'] for event in read] == [5, 4, 3]
+    assert read[0]['host'] == 'stackoverflow.com'
+    assert read[0]['badge_id'] == 3109
+    assert reader.read() == []
+
+    resumed = events.EventLogReader(path, offset=reader.offset)
+    assert resumed.read() == []
+
+
+def test_reader_leaves_partial_events(tmpdir):
+    path = tmpdir.join('partial.jsonl')
+    path.write_binary(b'{"a": 1}\n{"b":')
+
+    reader = events.EventLogReader(str(path))
+    assert reader.read() == [{'a': 1}]
+
+    path.write_binary(b'{"a": 1}\n{"b": 2}\n')
+    assert reader.read() == [{'b': 2}]
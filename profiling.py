@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+import contextlib
+import cProfile
+import io
+import logging
+import os
+import pstats
+import signal
+import threading
+import time
+import tracemalloc
+
+
+logger = logging.getLogger(__name__)
+
+
+# (file name, function name) pairs summarized after each profiled iteration.
+# A file name of None matches any file.
+HOT_PATHS = [
+    ('scraping.py', 'update'),
+    ('scraping.py', '_scrape_chunks'),
+    ('scraping.py', 'by_reason'),
+    ('election_observer.py', '_prepare_data'),
+    (None, 'render_to_file'),
+    ('storage.py', 'write_badge_data'),
+]
+
+
+class Profiler(object):
+    """Profiles iterations of the observer loop on request.
+
+    Call request() (or send the process SIGUSR1, once install_signal_handler()
+    has been called) to profile the next few iterations, each of which must
+    be wrapped in start_iteration() and finish_iteration(). Work done on other
+    threads is only included if it's wrapped in thread_scope().
+
+    For each profiled iteration, a cProfile .prof file and a -summary.txt of
+    the HOT_PATHS are written to directory, along with a tracemalloc snapshot
+    if memory is True.
+    """
+
+    logger = logging.getLogger(__name__).getChild('Profiler')
+
+    def __init__(self, directory='profiles', iterations=1, memory=False):
+        self.directory = directory
+        self.iterations = iterations
+        self.memory = memory
+        self._requested = 0
+        self._iteration = 0
+        self._profile = None
+        self._thread_profiles = []
+        self._lock = threading.Lock()
+
+    @property
+    def active(self):
+        return self._profile is not None
+
+    def request(self, iterations=None):
+        """Profiles the next iterations (by default, self.iterations)."""
+        if iterations is None:
+            iterations = self.iterations
+        self._requested = max(self._requested, iterations)
+
+    def install_signal_handler(self, signal_number=getattr(
+            signal, 'SIGUSR1', None)):
+        if signal_number is None:
+            self.logger.warning("Profiling signals aren't supported here.")
+            return
+
+        def handler(signal_number, frame):
+            self.request()
+
+        signal.signal(signal_number, handler)
+
+    def start_iteration(self):
+        self._iteration += 1
+        if not self._requested:
+            return
+
+        self._requested -= 1
+        self.logger.info("Profiling iteration %s.", self._iteration)
+        if self.memory:
+            tracemalloc.start()
+        self._start_time = time.time()
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+
+    def finish_iteration(self):
+        if not self.active:
+            return
+
+        self._profile.disable()
+        duration = time.time() - self._start_time
+
+        with self._lock:
+            stats = pstats.Stats(self._profile, *self._thread_profiles)
+            self._profile = None
+            self._thread_profiles = []
+
+        os.makedirs(self.directory, exist_ok=True)
+        path_base = os.path.join(
+            self.directory,
+            '{}-iteration-{}'.format(
+                time.strftime('%Y%m%d-%H%M%S'), self._iteration))
+
+        stats.dump_stats(path_base + '.prof')
+        with open(path_base + '-summary.txt', 'wt') as f:
+            f.write(
+                "Iteration {} took {:.3f}s.\n\n".format(
+                    self._iteration, duration))
+            f.write(summarize(stats))
+
+        if self.memory:
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            snapshot.dump(path_base + '.tracemalloc')
+            with open(path_base + '-summary.txt', 'at') as f:
+                f.write("\nTop allocations:\n")
+                for statistic in snapshot.statistics('lineno')[:25]:
+                    f.write("{}\n".format(statistic))
+
+        self.logger.info("Wrote profile to %s.prof.", path_base)
+
+    @contextlib.contextmanager
+    def thread_scope(self):
+        """Profiles the enclosed block, which may be run on another thread,
+        as part of the current iteration if it's being profiled.
+        """
+        if not self.active:
+            yield
+            return
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Newer Pythons only allow one profiler at a time.
+            self.logger.debug("Can't profile another thread at once.")
+            yield
+            return
+
+        try:
+            yield
+        finally:
+            profile.disable()
+            with self._lock:
+                if self.active:
+                    self._thread_profiles.append(profile)
+
+
+def summarize(stats, hot_paths=HOT_PATHS):
+    """Returns a table of the call counts and cumulative time of hot_paths,
+    followed by the usual pstats listing of the top functions.
+    """
+    summary = io.StringIO()
+    summary.write("{:<45} {:>10} {:>12}\n".format(
+        "function", "calls", "cumulative"))
+
+    for file_name, function_name in hot_paths:
+        calls = 0
+        cumulative_time = 0.0
+        for (path, _, name), (_, total_calls, _, cumulative, _) in (
+                stats.stats.items()):
+            if name == function_name and (
+                    file_name is None or os.path.basename(path) == file_name):
+                calls += total_calls
+                cumulative_time += cumulative
+        summary.write("{:<45} {:>10} {:>11.3f}s\n".format(
+            '{}:{}'.format(file_name or '*', function_name),
+            calls, cumulative_time))
+
+    summary.write("\n")
+    stats.stream = summary
+    stats.sort_stats('cumulative').print_stats(40)
+
+    return summary.getvalue()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+import logging
+import threading
+
+import profiling
+import scraping
+
+
+logger = logging.getLogger(__name__)
+
+
+def test_profiles_requested_iterations(tmpdir):
+    import test_responses.so_help_badges_3109_sheriff_x58e7 as response
+
+    profiler = profiling.Profiler(directory=str(tmpdir), memory=True)
+    badge_data = scraping.BadgeData(badge_id=3109, host=None)
+
+    profiler.start_iteration()
+    assert not profiler.active
+    profiler.finish_iteration()
+    assert tmpdir.listdir() == []
+
+    profiler.request(1)
+    profiler.start_iteration()
+    assert profiler.active
+    # As _scrape_all_badges() streams pages.
+    list(badge_data._scrape_chunks(
+        response.text[start:start + 16 * 1024]
+        for start in range(0, len(response.text), 16 * 1024)))
+
+    def on_another_thread():
+        with profiler.thread_scope():
+            badge_data.by_reason()
+    thread = threading.Thread(target=on_another_thread)
+    thread.start()
+    thread.join()
+
+    profiler.finish_iteration()
+    assert not profiler.active
+
+    names = sorted(path.basename for path in tmpdir.listdir())
+    assert len(names) == 3
+    assert names[0].endswith('-iteration-2-summary.txt')
+    assert names[1].endswith('-iteration-2.prof')
+    assert names[2].endswith('-iteration-2.tracemalloc')
+
+    summary = tmpdir.join(names[0]).read()
+    hot_path_calls = {
+        line.split()[0]: int(line.split()[1])
+        for line in summary.splitlines()
+        if line.startswith('scraping.py:')}
+    assert hot_path_calls['scraping.py:_scrape_chunks'] > 0
+    assert 'scraping.py:by_reason' in hot_path_calls
+    assert 'scraping.py:by_reason' in summary
+    assert 'Top allocations' in summary
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+import collections
+import concurrent.futures
+import contextlib
+import itertools
+import logging
+import math
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import election_observer
+import scraping
+import storage
+import synthetic
+
+
+logger = logging.getLogger(__name__)
+
+
+STAGES = ['load', 'update', 'aggregate', 'render', 'write']
+# Numbers of voters to benchmark. The real stackoverflow.com-constituent
+# data has about 190,000 badges, so the default sizes run from about today's
+# volume to 10 times it, and 'full' goes on to 100 times it, which needs
+# tens of gigabytes of memory. 'quick' is for checking the benchmark itself.
+PRESETS = collections.OrderedDict([
+    ('quick', [20000, 60000, 200000]),
+    ('default', [200000, 600000, 2000000]),
+    ('full', [200000, 600000, 2000000, 6000000, 20000000]),
+])
+DEFAULT_SIZES = PRESETS['default']
+DEFAULT_ELECTION_COUNT = 10
+# Stages whose time grows faster than this power of the size are flagged.
+SUPERLINEAR_EXPONENT = 1.2
+
+
+HOST = 'synthetic.example.com'
+CODEC = election_observer.DATA_CODECS['stackoverflow.com-constituent']
+
+
+def write_synthetic_data(voter_count, election_count, directory):
+    """Writes data files of synthetic election data with voter_count
+    Constituent badges to directory, returning their path bases.
+
+    The data files hold every election but the last. Its badges are written
+    to separate -new files, for run_pipeline() to scrape.
+    """
+    constituents, caucus = synthetic.generate_elections(
+        HOST, election_count, voter_count // election_count)
+    last_election_timestamp = (
+        synthetic.FIRST_ELECTION_TIMESTAMP +
+        (election_count - 1) * synthetic.ELECTION_INTERVAL_SECONDS)
+
+    path_bases = []
+    for badge_data in constituents, caucus:
+        path_base = os.path.join(
+            directory, '{}-{}'.format(HOST, badge_data.badge_id))
+        path_bases.append(path_base)
+
+        old_badges = []
+        new_badges = []
+        for badge in badge_data:
+            if badge.timestamp < last_election_timestamp:
+                old_badges.append(badge)
+            else:
+                new_badges.append(badge)
+
+        for path, badges in [
+                (path_base + '.json.xz', old_badges),
+                (path_base + '-new.json.xz', new_badges)]:
+            storage.write_badge_data(
+                path,
+                scraping.BadgeData(
+                    host=HOST, badge_id=badge_data.badge_id,
+                    instances=badges),
+                CODEC)
+
+    return path_bases
+
+
+def run_pipeline(path_bases, directory):
+    """Runs the observer's load, update, aggregate, render and write stages
+    on the data files written by write_synthetic_data(), working in
+    directory.
+
+    Returns an OrderedDict mapping each of STAGES to a tuple of its duration
+    in seconds and the peak memory use of the process after it, in bytes.
+    """
+    # Stand-ins for the pages that update() would download.
+    newest_first = {}
+    for path_base in path_bases:
+        new_badge_data = storage.read_badge_data(path_base + '-new')
+        newest_first[new_badge_data.badge_id] = sorted(
+            new_badge_data, key=lambda badge: -badge.timestamp)
+    del new_badge_data
+
+    original_directory = os.getcwd()
+    os.chdir(directory)
+    try:
+        os.makedirs('images', exist_ok=True)
+        results = collections.OrderedDict()
+
+        @contextlib.contextmanager
+        def stage(name):
+            logger.info("Running %s stage.", name)
+            start = time.time()
+            yield
+            results[name] = time.time() - start, _peak_memory()
+
+        with stage('load'):
+            loaded = storage.load_badge_data_in_parallel(path_bases)
+            all_badge_data = [loaded[path_base] for path_base in path_bases]
+
+        with stage('update'):
+            for badge_data in all_badge_data:
+                badges = newest_first[badge_data.badge_id]
+                badge_data._scrape_all_badges = (
+                    lambda badge_data=badge_data, badges=badges:
+                    _scrape_synthetic_pages(badge_data, badges))
+                badge_data.update()
+
+        with stage('aggregate'):
+            so_constituents, so_caucus = all_badge_data
+            constituents_by_reason = so_constituents.by_reason()
+            caucus_by_reason = so_caucus.by_reason()
+            elections = {}
+            for reason in constituents_by_reason:
+                election = election_observer.ElectionData(
+                    host=HOST,
+                    constituent_badges=constituents_by_reason[reason],
+                    caucus_badges=caucus_by_reason.get(reason, []))
+                elections[election.id] = election
+
+        with stage('render'):
+            for election in elections.values():
+                election.hello_graphs()
+            election_observer.conversion_and_retention_graphs(
+                HOST, elections)
+
+        with stage('write'):
+            for path_base, badge_data in zip(path_bases, all_badge_data):
+                storage.write_badge_data(
+                    path_base + '.json.xz', badge_data, CODEC)
+
+        return results
+    finally:
+        os.chdir(original_directory)
+
+
+def _scrape_synthetic_pages(badge_data, badges):
+    """Replaces BadgeData._scrape_all_badges(), streaming pages of badges
+    through the real parser instead of downloading them.
+    """
+    page_count_values = []
+    chunk_size = scraping.BadgeData.STREAM_CHUNK_SIZE
+
+    for page_number in itertools.count(1):
+        html = synthetic.badge_page_html(badge_data, page_number, badges)
+        yield from badge_data._scrape_chunks(
+            (html[start:start + chunk_size]
+             for start in range(0, len(html), chunk_size)),
+            page_count_values)
+
+        if page_number > page_count_values[-1]:
+            return
+
+
+def _peak_memory():
+    """Returns the peak resident memory of this process or, if any were
+    larger, its child processes, in bytes.
+    """
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # Linux reports kilobytes, macOS bytes.
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def benchmark(sizes=DEFAULT_SIZES, election_count=DEFAULT_ELECTION_COUNT):
+    """Runs the pipeline at each size, in a fresh process each time so that
+    their peak memory use can be measured separately.
+
+    Returns a list of (size, results) tuples, with results as returned by
+    run_pipeline().
+    """
+    benchmarks = []
+
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            with concurrent.futures.ProcessPoolExecutor(1) as executor:
+                path_bases = executor.submit(
+                    write_synthetic_data, size, election_count,
+                    directory).result()
+            with concurrent.futures.ProcessPoolExecutor(1) as executor:
+                results = executor.submit(
+                    run_pipeline, path_bases, directory).result()
+        benchmarks.append((size, results))
+
+    return benchmarks
+
+
+def scaling_exponents(smaller, larger):
+    """Returns the power of the size that each stage's time grew by between
+    two benchmarks: about 1 if it's linear, 2 if it's quadratic.
+    """
+    (small_size, small_results), (large_size, large_results) = smaller, larger
+    exponents = collections.OrderedDict()
+    for name in STAGES:
+        small_seconds = max(small_results[name][0], 1e-6)
+        large_seconds = max(large_results[name][0], 1e-6)
+        exponents[name] = (
+            math.log(large_seconds / small_seconds) /
+            math.log(large_size / small_size))
+    return exponents
+
+
+def main(*args):
+    flags = set(args)
+
+    sizes = DEFAULT_SIZES
+    election_count = DEFAULT_ELECTION_COUNT
+    for flag in list(flags):
+        if flag.startswith('--sizes='):
+            sizes = [int(size) for size in flag.partition('=')[2].split(',')]
+            flags.remove(flag)
+        elif flag.startswith('--preset='):
+            sizes = PRESETS[flag.partition('=')[2]]
+            flags.remove(flag)
+        elif flag.startswith('--elections='):
+            election_count = int(flag.partition('=')[2])
+            flags.remove(flag)
+
+    assert not flags
+
+    logging.basicConfig(level=logging.WARNING)
+
+    benchmarks = benchmark(sorted(sizes), election_count)
+
+    print("{} CPUs, {} elections".format(os.cpu_count(), election_count))
+    print(("{:>10}" + " {:>10}" * len(STAGES) + " {:>10}").format(
+        "voters", *STAGES + ["peak MB"]))
+    for size, results in benchmarks:
+        peak = max(peak for _, peak in results.values())
+        print(("{:>10}" + " {:>9.3f}s" * len(STAGES) + " {:>10.1f}").format(
+            size, *[results[name][0] for name in STAGES] +
+            [peak / 1024 / 1024]))
+
+    if len(benchmarks) > 1:
+        print()
+        print("Time grew as size to the power of:")
+        for smaller, larger in zip(benchmarks, benchmarks[1:]):
+            exponents = scaling_exponents(smaller, larger)
+            print(("{:>10}" + " {:>10}" * len(STAGES)).format(
+                '{}x'.format(round(larger[0] / smaller[0], 1)),
+                *[
+                    '{:.2f}{}'.format(
+                        exponent,
+                        '*' if exponent > SUPERLINEAR_EXPONENT else '')
+                    for exponent in exponents.values()]))
+        print("* superlinear")
+
+
+if __name__ == '__main__':
+    sys.exit(main(*sys.argv[1:]))
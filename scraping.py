@@ -1,10 +1,17 @@
 #!/usr/bin/env python3
+import array
+import bisect
 import calendar
 import collections.abc
+import contextlib
 import csv
-import datetime
+import heapq
 import itertools
 import logging
+import os
+import pickle
+import re
+import tempfile
 import time
 
 import requests
@@ -13,10 +20,62 @@ import requests
 logger = logging.getLogger(__name__)
 
 
+_ISO1608_PATTERN = re.compile(
+    r'([0-9]{4})-([0-9]{2})-([0-9]{2}) ([0-9]{2}):([0-9]{2}):([0-9]{2})Z\Z')
+
+
 def timestamp_from_iso1608(s):
     """Returns the unix timestamp for a Stack Exchange ISO 1608 date/time."""
-    return calendar.timegm(
-        datetime.datetime.strptime(s, '%Y-%m-%d %H:%M:%SZ').timetuple())
+    return _parse_iso1608(s, {})
+
+
+def timestamps_from_iso1608(strings):
+    """Returns an array of the unix timestamps for many Stack Exchange ISO
+    1608 date/times. This is faster than timestamp_from_iso1608() for each,
+    because the many that share a date only have it converted once.
+    """
+    days_by_date = {}
+    return array.array(
+        'q', [_parse_iso1608(s, days_by_date) for s in strings])
+
+
+def iso1608_from_timestamp(timestamp):
+    """Returns the Stack Exchange ISO 1608 date/time for a unix timestamp."""
+    return time.strftime('%Y-%m-%d %H:%M:%SZ', time.gmtime(timestamp))
+
+
+def _parse_iso1608(s, days_by_date):
+    match = _ISO1608_PATTERN.match(s)
+    if not match:
+        raise ValueError("Not a Stack Exchange date/time: {!r}".format(s))
+    year, month, day, hour, minute, second = map(int, match.groups())
+
+    date = s[:10]
+    days = days_by_date.get(date)
+    if days is None:
+        if not (1 <= month <= 12 and
+                1 <= day <= calendar.monthrange(year, month)[1]):
+            raise ValueError("Not a Stack Exchange date/time: {!r}".format(s))
+        days = days_by_date[date] = _days_since_epoch(year, month, day)
+
+    if hour > 23 or minute > 59 or second > 61:
+        raise ValueError("Not a Stack Exchange date/time: {!r}".format(s))
+
+    return days * 86400 + hour * 3600 + minute * 60 + second
+
+
+def _days_since_epoch(year, month, day):
+    # The proleptic Gregorian calendar, counting years from March so that
+    # leap days come at the end.
+    if month <= 2:
+        year -= 1
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * (month + (-3 if month > 2 else 9)) + 2) // 5 + day - 1
+    day_of_era = (
+        year_of_era * 365 + year_of_era // 4 - year_of_era // 100 +
+        day_of_year)
+    return era * 146097 + day_of_era - 719468
 
 
 class BadgeData(collections.abc.Iterable):
@@ -24,43 +83,301 @@ class BadgeData(collections.abc.Iterable):
     badge that have been awarded on a Stack Exchange site.
 
     Iteration over BadgeData yields all instances in chronological order.
+
+    If set_memory_budget() is used, older instances are spilled to
+    BadgeSegments on disk, and only read back in while iterating.
     """
 
     FIELD_NAMES = 'user_id', 'utc_time'
+    INTEGER_COLUMNS = 'user_id', 'timestamp', 'rep', 'gold', 'silver', 'bronze'
+    JSON_FORMAT = 2
     REQUEST_INTERVAL_SECONDS = 0.5
+    STREAM_CHUNK_SIZE = 16 * 1024
+    TABLE_MARKER = '<div class="single-badge-table'
+    ROW_MARKER = '<div class="single-badge-row-'
+    PAGER_MARKER = '<div class="pager'
     logger = logging.getLogger(__name__).getChild('BadgeData')
 
     def __init__(self, host, badge_id, instances=()):
         self.host = host
         self.badge_id = badge_id
         self._instances = set(instances)
+        # Incremented whenever new instances are added, so that writers can
+        # tell whether there's anything new to persist.
+        self.generation = 0
+        self.memory_budget = None
+        self.spill_directory = None
+        # Spilled instances, in chronological order. Never overlapping, so
+        # only one needs to be in memory at a time while iterating.
+        self._segments = []
+        # Spilled instances that have been read back in by update().
+        self._paged_in = {}
+        # An events.EventLog that new instances are appended to, if any.
+        self.event_log = None
+        # A BadgeIndex of the in-memory instances, built when first needed.
+        self._badge_index = None
+        # Every instance awarded up to this timestamp is already recorded
+        # (for example, from a data dump), so update() can stop there.
+        self.complete_until = None
 
     def to_json(self):
-        return {
+        """Returns the instances in a JSON-compatible column-oriented form.
+
+        The repeated reason_html strings are stored once and referred to by
+        index, and each timestamp is stored as the difference from the one
+        before it, which makes the data much smaller (and more compressible).
+        """
+        columns = self.to_columns()
+
+        data = {
             'host': self.host,
             'badge_id': self.badge_id,
-            'instances': [ instance.to_json() for instance in self ]
+            'format': self.JSON_FORMAT,
+            'complete_until': columns['complete_until'],
+            'reasons': columns['reasons'],
+            'reason_index': columns['reason_index'].tolist(),
+            'username_html': columns['username_html'],
+            'timestamp_delta': [
+                timestamp - previous for timestamp, previous in zip(
+                    columns['timestamp'],
+                    itertools.chain([0], columns['timestamp']))],
         }
+        for name in self.INTEGER_COLUMNS:
+            if name != 'timestamp':
+                data[name] = columns[name].tolist()
+
+        return data
 
     @classmethod
     def from_json(cls, data):
-        return cls(
-            host=data['host'],
-            badge_id=data['badge_id'],
-            instances=[
-                Badge.from_json(instance_data, badge_id=data['badge_id'])
-                for instance_data in data['instances']])
+        return cls.from_columns(cls.columns_from_json(data))
+
+    def to_columns(self):
+        """Returns the instances as a compact column-oriented dict, in
+        chronological order.
+
+        Integer fields are stored in arrays, and the heavily-repeated
+        reason_html strings are stored once in 'reasons' and referred to by
+        index. This is much cheaper to pickle than Badge objects.
+        """
+
+        instances = list(self)
+
+        reason_indices = {}
+        for badge in instances:
+            reason_indices.setdefault(badge.reason_html, len(reason_indices))
+
+        columns = {
+            'host': self.host,
+            'badge_id': self.badge_id,
+            'complete_until': self.complete_until,
+            'reasons': sorted(reason_indices, key=reason_indices.get),
+            'reason_index': array.array('l', [
+                reason_indices[badge.reason_html] for badge in instances]),
+            'username_html': [badge.username_html for badge in instances],
+        }
+        for name in self.INTEGER_COLUMNS:
+            columns[name] = array.array(
+                'q', [getattr(badge, name) for badge in instances])
+
+        return columns
+
+    @classmethod
+    def columns_from_json(cls, data):
+        """Converts the output of to_json() directly into the to_columns()
+        form, without constructing any Badges.
+
+        This also accepts the original format, which had a list of
+        Badge.to_json() 'instances'.
+        """
+
+        if 'instances' in data:
+            return cls._columns_from_instances_json(data)
+
+        columns = {
+            'host': data['host'],
+            'badge_id': data['badge_id'],
+            'complete_until': data.get('complete_until'),
+            'reasons': data['reasons'],
+            'reason_index': array.array('l', data['reason_index']),
+            'username_html': data['username_html'],
+            'timestamp': array.array(
+                'q', itertools.accumulate(data['timestamp_delta'])),
+        }
+        for name in cls.INTEGER_COLUMNS:
+            if name != 'timestamp':
+                columns[name] = array.array('q', data[name])
+
+        return columns
+
+    @classmethod
+    def _columns_from_instances_json(cls, data):
+        badge_id = data['badge_id']
+        instances = [
+            instance if 'html' not in instance else
+            Badge.from_json(instance, badge_id=badge_id).to_json()
+            for instance in data['instances']]
+
+        reason_indices = {}
+        for instance in instances:
+            reason_indices.setdefault(
+                instance['reason_html'], len(reason_indices))
+
+        columns = {
+            'host': data['host'],
+            'badge_id': badge_id,
+            'complete_until': None,
+            'reasons': sorted(reason_indices, key=reason_indices.get),
+            'reason_index': array.array('l', [
+                reason_indices[instance['reason_html']]
+                for instance in instances]),
+            'username_html': [
+                instance['username_html'] for instance in instances],
+        }
+        # The earliest files only have each instance's stack_time.
+        timestamps = [instance.get('timestamp') for instance in instances]
+        missing = [
+            i for i, timestamp in enumerate(timestamps) if timestamp is None]
+        for i, timestamp in zip(missing, timestamps_from_iso1608(
+                instances[i]['stack_time'] for i in missing)):
+            timestamps[i] = timestamp
+        columns['timestamp'] = array.array('q', timestamps)
+
+        for name in cls.INTEGER_COLUMNS:
+            if name != 'timestamp':
+                columns[name] = array.array(
+                    'q', [instance[name] for instance in instances])
+
+        return columns
+
+    @classmethod
+    def from_columns(cls, columns):
+        badge_id = columns['badge_id']
+        reasons = columns['reasons']
+
+        instances = []
+        for (reason_index, username_html,
+             user_id, timestamp, rep, gold, silver, bronze) in zip(
+                columns['reason_index'], columns['username_html'],
+                *(columns[name] for name in cls.INTEGER_COLUMNS)):
+            badge = Badge(badge_id=badge_id)
+            badge.reason_html = reasons[reason_index]
+            badge.username_html = username_html
+            badge.user_id = user_id
+            badge.timestamp = timestamp
+            badge.rep = rep
+            badge.gold = gold
+            badge.silver = silver
+            badge.bronze = bronze
+            instances.append(badge)
+
+        badge_data = cls(
+            host=columns['host'], badge_id=badge_id, instances=instances)
+        badge_data.complete_until = columns.get('complete_until')
+        return badge_data
 
     def __repr__(self):
         return (
             '<{0.__class__.__name__} for {0.host}/badges/{0.badge_id} with {1} '
-            'instances>'.format(self, len(self._instances)))
+            'instances>'.format(self, len(self)))
 
     def __iter__(self):
-        return iter(sorted(self._instances, key=lambda badge: badge.timestamp))
+        if self._badge_index is not None:
+            in_memory = list(self._badge_index.badges)
+        else:
+            in_memory = sorted(
+                self._instances, key=lambda badge: badge.timestamp)
+        if not self._segments:
+            return iter(in_memory)
+
+        spilled = itertools.chain.from_iterable(
+            segment.load() for segment in self._segments)
+        return _merge_chronologically(spilled, in_memory)
 
     def __len__(self):
-        return len(self._instances)
+        return (
+            len(self._instances) +
+            sum(len(segment) for segment in self._segments))
+
+    def set_memory_budget(self, max_instances, spill_directory=None):
+        """Limits the number of instances kept in memory to max_instances,
+        spilling the oldest to files in a new subdirectory of spill_directory
+        (or of the system temporary directory) whenever update() exceeds it.
+
+        This only bounds memory between uses of the whole data set. Iterating,
+        by_reason(), for_user() and writing all read every segment back in.
+        """
+        self.memory_budget = max_instances
+        if self.spill_directory is None:
+            self.spill_directory = tempfile.mkdtemp(
+                prefix='{}-{}-'.format(self.host, self.badge_id),
+                dir=spill_directory)
+        self._spill_if_over_budget()
+
+    def _spill_if_over_budget(self):
+        if (self.memory_budget is None or
+                len(self._instances) <= self.memory_budget):
+            return
+
+        in_memory = sorted(self._instances, key=lambda badge: badge.timestamp)
+
+        # Spill down to half of the budget, so that we aren't writing a tiny
+        # segment after every update. At least the newest badge is kept, so
+        # there's always a cutoff, even with a budget of 0 or 1.
+        kept_count = max(self.memory_budget // 2, 1)
+        cutoff = in_memory[len(in_memory) - kept_count].timestamp
+
+        # Badges older than the last segment can only be late arrivals. They
+        # stay in memory so that segments never overlap.
+        if self._segments:
+            spilled_until = self._segments[-1].end_timestamp
+        else:
+            spilled_until = in_memory[0].timestamp
+
+        spilled = [
+            badge for badge in in_memory
+            if spilled_until <= badge.timestamp < cutoff]
+        if not spilled:
+            return
+
+        # Segments are no bigger than the budget, so that iterating over
+        # them doesn't need more memory than that either.
+        segment_size = max(self.memory_budget, 1)
+        for start in range(0, len(spilled), segment_size):
+            path = os.path.join(
+                self.spill_directory,
+                'segment-{}.pickle'.format(len(self._segments)))
+            self._segments.append(BadgeSegment.write(
+                path, host=self.host, badge_id=self.badge_id,
+                instances=spilled[start:start + segment_size]))
+        self._instances.difference_update(spilled)
+        self._badge_index = None
+
+        self.logger.info(
+            "Spilled %s instances to %s, leaving %s in memory.",
+            len(spilled), self.spill_directory, len(self._instances))
+
+    def _is_spilled(self, badge):
+        for segment in self._segments:
+            if (segment.start_timestamp <= badge.timestamp <=
+                    segment.end_timestamp):
+                if segment.path not in self._paged_in:
+                    self._paged_in[segment.path] = set(segment.load())
+                if badge in self._paged_in[segment.path]:
+                    return True
+        return False
+
+    def snapshot(self):
+        """Returns a copy of this BadgeData that won't be affected by future
+        updates. Badges themselves are never modified after being scraped, so
+        only the set of instances needs to be copied.
+        """
+        snapshot = self.__class__(host=self.host, badge_id=self.badge_id)
+        snapshot._instances = self._instances.copy()
+        snapshot._segments = list(self._segments)
+        snapshot.generation = self.generation
+        snapshot.complete_until = self.complete_until
+        return snapshot
 
     def update(self, stop_on_existing=False):
         """Scrape the site, saving all new badge instances to the data file.
@@ -72,20 +389,45 @@ class BadgeData(collections.abc.Iterable):
         contains *all* instances up to any specific point in time.
         PLEASE NOTE that BadgeData's implementation does not guarauntee this
         if an update() has been interrupted.
+
+        Scraping always stops at badges awarded at or before complete_until.
         """
 
         previously_existing = set(self._instances)
 
-        for badge in self._scrape_all_badges():
-            if badge not in self._instances:
-                self._instances.add(badge)
-                self.logger.debug("Scraped badge: %r.", badge)
-            elif badge in previously_existing:
-                self.logger.debug("Scraped already-known badge %r.", badge)
-                return
-            # else it's probably slight page overlap from data changing
-
-        self.logger.info("Reached end of badge list. Update complete.")
+        try:
+            for badge in self._scrape_all_badges():
+                if (self.complete_until is not None and
+                        badge.timestamp <= self.complete_until):
+                    self.logger.debug(
+                        "Scraped badge %r from before %s.",
+                        badge, iso1608_from_timestamp(self.complete_until))
+                    return
+                if badge in self._instances:
+                    if badge in previously_existing:
+                        self.logger.debug(
+                            "Scraped already-known badge %r.", badge)
+                        return
+                    # else it's probably slight page overlap from data changing
+                elif self._is_spilled(badge):
+                    self.logger.debug(
+                        "Scraped already-known spilled badge %r.", badge)
+                    return
+                else:
+                    self._instances.add(badge)
+                    if self._badge_index is not None:
+                        self._badge_index.add(badge)
+                    self.generation += 1
+                    self.logger.debug("Scraped badge: %r.", badge)
+                    if self.event_log is not None:
+                        self.event_log.append(self, badge)
+
+            self.logger.info("Reached end of badge list. Update complete.")
+        finally:
+            if self.event_log is not None:
+                self.event_log.flush()
+            self._paged_in.clear()
+            self._spill_if_over_budget()
 
     def _scrape_all_badges(self):
         """Yields instances of all badges on the site, scraping them
@@ -102,8 +444,15 @@ class BadgeData(collections.abc.Iterable):
             url = 'https://{}/help/badges/{}?page={}'.format(
                 self.host, self.badge_id, page_number)
 
-            response = requests.get(url)
-            yield from self._scrape_response(response, page_count_values)
+            response = requests.get(url, stream=True)
+            with contextlib.closing(response):
+                if response.encoding is None:
+                    response.encoding = 'utf-8'
+                yield from self._scrape_chunks(
+                    response.iter_content(
+                        chunk_size=self.STREAM_CHUNK_SIZE,
+                        decode_unicode=True),
+                    page_count_values)
 
             if page_number > page_count_values[-1]:
                 self.logger.info("Now past last page.")
@@ -118,32 +467,229 @@ class BadgeData(collections.abc.Iterable):
                 page_number, page_count_values[-1], eta)
 
     def _scrape_response(self, response, page_count_values=None):
-        page_count_raw = (response.text
-            .rpartition('<span class="page-numbers">')[2]
-            .partition('<')[0])
-        page_count = int(page_count_raw) if page_count_raw else 1
-        if page_count_values is not None:
-            page_count_values.append(page_count)
+        yield from self._scrape_chunks([response.text], page_count_values)
+
+    def _scrape_chunks(self, chunks, page_count_values=None):
+        """Yields the badges from a badge page, given an iterable of pieces of
+        its HTML such as a streaming response's iter_content().
 
-        without_leading_crap = response.text.partition(
-            '<div class="single-badge-table')[2]
-        also_without_trailing_crap = without_leading_crap.partition(
-            '<div class="pager')[0]
-        row_pieces = also_without_trailing_crap.split(
-            '<div class="single-badge-row-')[1:]
+        Each badge is yielded as soon as the end of its row has been read, and
+        no more chunks are read once the pager (which has the page count) has
+        been. The page count (or 1, if there's no pager) is appended to
+        page_count_values, if given.
+        """
 
-        for row_piece in row_pieces:
-            yield Badge(badge_id=self.badge_id, html=row_piece)
+        buffer = ''
+        state = 'before table'
+
+        for chunk in chunks:
+            buffer += chunk
+
+            if state == 'before table':
+                table_start = buffer.find(self.TABLE_MARKER)
+                if table_start < 0:
+                    # Keep enough to find the marker if it's split by a chunk.
+                    buffer = buffer[-len(self.TABLE_MARKER):]
+                    continue
+                buffer = buffer[table_start + len(self.TABLE_MARKER):]
+                state = 'rows'
+
+            if state == 'rows':
+                pager_start = buffer.find(self.PAGER_MARKER)
+                if pager_start < 0:
+                    row_pieces = buffer.split(self.ROW_MARKER)
+                    # The last row may not have been completely read yet.
+                    if len(row_pieces) > 1:
+                        buffer = self.ROW_MARKER + row_pieces[-1]
+                    for row_piece in row_pieces[1:-1]:
+                        yield Badge(badge_id=self.badge_id, html=row_piece)
+                    continue
+
+                row_pieces = buffer[:pager_start].split(self.ROW_MARKER)
+                buffer = buffer[pager_start:]
+                state = 'pager'
+                for row_piece in row_pieces[1:]:
+                    yield Badge(badge_id=self.badge_id, html=row_piece)
+
+            if state == 'pager':
+                pager_end = buffer.find('</div>')
+                if pager_end >= 0:
+                    buffer = buffer[:pager_end]
+                    break
+        else:
+            if state == 'rows':
+                for row_piece in buffer.split(self.ROW_MARKER)[1:]:
+                    yield Badge(badge_id=self.badge_id, html=row_piece)
+
+        if page_count_values is not None:
+            # Pages without a pager, such as error pages or a badge with only
+            # one page, are counted as a single page.
+            page_count_values.append(
+                _page_count(buffer) if state == 'pager' else 1)
 
     def by_reason(self):
+        if not self._segments:
+            return {
+                reason: list(badges)
+                for reason, badges in self._index().by_reason.items()
+            }
+
         by_reason = {}
         for badge in self:
             by_reason.setdefault(badge.reason_html, []).append(badge)
         return by_reason
 
+    def between(self, start_timestamp, end_timestamp):
+        """Returns the instances awarded from start_timestamp up to (but not
+        including) end_timestamp, in chronological order.
+
+        Only the spilled segments overlapping that range are read.
+        """
+        in_memory = self._index().between(start_timestamp, end_timestamp)
+
+        spilled = [
+            badge
+            for segment in self._segments
+            if (segment.start_timestamp < end_timestamp and
+                segment.end_timestamp >= start_timestamp)
+            for badge in segment.load()
+            if start_timestamp <= badge.timestamp < end_timestamp]
+
+        if not spilled:
+            return in_memory
+        return list(_merge_chronologically(spilled, in_memory))
+
+    def for_user(self, user_id):
+        """Returns the instances awarded to user_id, in chronological order.
+
+        Every spilled segment has to be read to find these.
+        """
+        in_memory = self._index().by_user.get(user_id, [])
+
+        spilled = [
+            badge
+            for segment in self._segments
+            for badge in segment.load()
+            if badge.user_id == user_id]
+
+        if not spilled:
+            return list(in_memory)
+        return list(_merge_chronologically(spilled, in_memory))
+
+    def _index(self):
+        if self._badge_index is None:
+            self._badge_index = BadgeIndex(self._instances)
+        return self._badge_index
+
+class BadgeIndex(object):
+    """Badges indexed by time, by user and by reason, each in chronological
+    order, so that queries only cost time proportional to their results.
+    """
+
+    def __init__(self, badges=()):
+        self.badges = sorted(badges, key=lambda badge: badge.timestamp)
+        self.timestamps = [badge.timestamp for badge in self.badges]
+        self.by_user = {}
+        self.by_reason = {}
+
+        # Already in chronological order, so the groups can just be appended.
+        for badge in self.badges:
+            self.by_user.setdefault(badge.user_id, []).append(badge)
+            self.by_reason.setdefault(badge.reason_html, []).append(badge)
+
+    def add(self, badge):
+        index = bisect.bisect_right(self.timestamps, badge.timestamp)
+        self.timestamps.insert(index, badge.timestamp)
+        self.badges.insert(index, badge)
+
+        _insert_chronologically(
+            self.by_user.setdefault(badge.user_id, []), badge)
+        _insert_chronologically(
+            self.by_reason.setdefault(badge.reason_html, []), badge)
+
+    def between(self, start_timestamp, end_timestamp):
+        return self.badges[
+            bisect.bisect_left(self.timestamps, start_timestamp):
+            bisect.bisect_left(self.timestamps, end_timestamp)]
+
+    def __len__(self):
+        return len(self.badges)
+
+
+def _insert_chronologically(badges, badge):
+    # New badges are almost always the latest, so search from the end.
+    index = len(badges)
+    while index and badges[index - 1].timestamp > badge.timestamp:
+        index -= 1
+    badges.insert(index, badge)
+
+
+class BadgeSegment(object):
+    """A chronological range of a BadgeData's instances, spilled to a file.
+
+    Segments are never modified once written.
+    """
+
+    def __init__(self, path, count, start_timestamp, end_timestamp):
+        self.path = path
+        self.count = count
+        self.start_timestamp = start_timestamp
+        self.end_timestamp = end_timestamp
+
+    @classmethod
+    def write(cls, path, host, badge_id, instances):
+        badge_data = BadgeData(host=host, badge_id=badge_id, instances=instances)
+        instances = list(badge_data)
+
+        with open(path, 'wb') as f:
+            pickle.dump(badge_data.to_columns(), f, pickle.HIGHEST_PROTOCOL)
+
+        return cls(
+            path=path,
+            count=len(instances),
+            start_timestamp=instances[0].timestamp,
+            end_timestamp=instances[-1].timestamp)
+
+    def load(self):
+        """Reads the segment's instances, in chronological order."""
+        with open(self.path, 'rb') as f:
+            return list(BadgeData.from_columns(pickle.load(f)))
+
+    def __len__(self):
+        return self.count
+
+    def __repr__(self):
+        return (
+            '<{0.__class__.__name__} of {0.count} instances from '
+            '{0.start_timestamp} to {0.end_timestamp} in {0.path}>'
+            .format(self))
+
+
+def _page_count(pager_html):
+    page_count_raw = (pager_html
+        .rpartition('<span class="page-numbers">')[2]
+        .partition('<')[0])
+    return int(page_count_raw) if page_count_raw else 1
+
+
+def _merge_chronologically(*iterables):
+    """Merges chronologically-ordered iterables of badges."""
+    def decorated(i, iterable):
+        for j, badge in enumerate(iterable):
+            yield badge.timestamp, i, j, badge
+
+    for _, _, _, badge in heapq.merge(*(
+            decorated(i, iterable) for i, iterable in enumerate(iterables))):
+        yield badge
+
+
 class Badge(collections.abc.Hashable):
     """An awarded instance of a particular badge."""
 
+    __slots__ = (
+        'badge_id', 'reason_html', 'user_id', 'timestamp', 'username_html',
+        'rep', 'gold', 'silver', 'bronze')
+
     def __init__(self, badge_id, html=None):
         self.badge_id = badge_id
 
@@ -156,11 +702,10 @@ class Badge(collections.abc.Hashable):
                 html
                 .partition('<a href="/users/')[2]
                 .partition('/')[0])
-            self.stack_time = (
+            self.timestamp = timestamp_from_iso1608(
                 html
                 .partition('Awarded <span title="')[2]
-                .partition('"')[0]) or None
-            self.timestamp = timestamp_from_iso1608(self.stack_time)
+                .partition('"')[0])
             self.username_html = (
                 html
                 .partition('<a href="/users/')[2]
@@ -208,8 +753,10 @@ class Badge(collections.abc.Hashable):
             self.reason_html = data['reason_html']
             self.user_id = data['user_id']
             self.username_html = data['username_html']
-            self.stack_time = data['stack_time']
-            self.timestamp = data['timestamp']
+            if 'timestamp' in data:
+                self.timestamp = data['timestamp']
+            else:
+                self.timestamp = timestamp_from_iso1608(data['stack_time'])
             self.rep = data['rep']
             self.gold = data['gold']
             self.silver = data['silver']
@@ -226,7 +773,6 @@ class Badge(collections.abc.Hashable):
             return {
                 'reason_html': self.reason_html,
                 'user_id': self.user_id,
-                'stack_time': self.stack_time,
                 'timestamp': self.timestamp,
                 'username_html': self.username_html,
                 'rep': self.rep,
@@ -235,6 +781,11 @@ class Badge(collections.abc.Hashable):
                 'bronze': self.bronze,
             }
 
+    @property
+    def stack_time(self):
+        """The time the badge was awarded, in Stack Exchange's format."""
+        return iso1608_from_timestamp(self.timestamp)
+
     def __eq__(self, other):
         return (self.badge_id == other.badge_id and
                 self.user_id == other.user_id and
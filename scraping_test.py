@@ -1,9 +1,11 @@
 #!/usr/bin/env python3
 import logging
+import time
 
 import pytest
 
 import scraping
+import testing
 
 
 logger = logging.getLogger(__name__)
@@ -90,3 +92,193 @@ def test_scrape_steward():
     
     fake_badge._instances.update(badges)
     assert fake_badge.to_json()
+
+
+def test_memory_budget_spills_old_instances(tmpdir):
+    badges = [testing.make_badge(user_id=n, timestamp=n * 60) for n in range(1, 101)]
+    badge_data = scraping.BadgeData(
+        host='stackoverflow.com', badge_id=3109, instances=badges[:90])
+
+    badge_data.set_memory_budget(20, spill_directory=str(tmpdir))
+
+    assert len(badge_data._instances) == 10
+    assert len(badge_data) == 90
+    assert list(badge_data) == badges[:90]
+    assert len(badge_data.by_reason()[None]) == 90
+
+    badge_data._scrape_all_badges = lambda: reversed(badges)
+    badge_data.update()
+
+    assert len(badge_data) == 100
+    assert list(badge_data) == badges
+
+    # A badge we've spilled stops the update, but a late one is added.
+    late_badge = testing.make_badge(user_id=1000, timestamp=30 * 60)
+    badge_data._scrape_all_badges = lambda: iter([late_badge, badges[5]])
+    badge_data.update()
+
+    assert len(badge_data) == 101
+    assert late_badge in list(badge_data)
+    assert [badge.timestamp for badge in badge_data] == sorted(
+        badge.timestamp for badge in badges + [late_badge])
+
+
+@pytest.mark.parametrize('chunk_size', [7, 100, 4096])
+def test_scrape_chunks_matches_whole_response(chunk_size):
+    import test_responses.so_help_badges_1973_caucus_x6dee as response
+
+    fake_badge = scraping.BadgeData(badge_id=1973, host=None)
+    # How whole pages were originally parsed.
+    expected = [
+        scraping.Badge(badge_id=1973, html=row_piece).to_json()
+        for row_piece in (
+            response.text
+            .partition('<div class="single-badge-table')[2]
+            .partition('<div class="pager')[0]
+            .split('<div class="single-badge-row-')[1:])]
+
+    chunks_read = []
+    def chunks():
+        for start in range(0, len(response.text), chunk_size):
+            chunks_read.append(start)
+            yield response.text[start:start + chunk_size]
+
+    page_count_values = []
+    badges = [
+        badge.to_json() for badge in
+        fake_badge._scrape_chunks(chunks(), page_count_values)]
+
+    assert badges == expected
+    assert len(badges) == 60
+    assert badges[0]['user_id'] != badges[-1]['user_id']
+    assert page_count_values == [3710]
+    # It should stop reading once it's past the pager.
+    assert chunks_read[-1] < response.text.index('<div id="sidebar"')
+
+
+def test_queries_are_kept_up_to_date(tmpdir):
+    badges = [
+        testing.make_badge(user_id=n % 3, timestamp=n * 60) for n in range(1, 101)]
+    badge_data = scraping.BadgeData(
+        host='stackoverflow.com', badge_id=3109, instances=badges[:90])
+
+    assert badge_data.between(60, 5 * 60) == badges[:4]
+    assert badge_data.for_user(1) == badges[0:90:3]
+    assert badge_data.for_user(102937) == []
+
+    badge_data._scrape_all_badges = lambda: reversed(badges)
+    badge_data.update()
+
+    assert badge_data.between(89 * 60, 1000 * 60) == badges[88:]
+    assert badge_data.for_user(1) == badges[0::3]
+    assert badge_data.by_reason() == {None: badges}
+
+    badge_data.set_memory_budget(20, spill_directory=str(tmpdir))
+
+    assert badge_data.between(60, 5 * 60) == badges[:4]
+    assert badge_data.between(50 * 60, 95 * 60) == badges[49:94]
+    assert badge_data.for_user(1) == badges[0::3]
+    assert badge_data.by_reason() == {None: badges}
+
+
+def test_timestamps_from_iso1608_matches_strptime():
+    import calendar
+    import datetime
+
+    strings = [
+        time.strftime('%Y-%m-%d %H:%M:%SZ', time.gmtime(timestamp))
+        for timestamp in range(-10 ** 9, 4 * 10 ** 9, 10 ** 9 // 7 + 12345)
+    ] + ['2000-02-29 23:59:59Z', '2015-04-20 01:00:15Z']
+
+    expected = [
+        calendar.timegm(datetime.datetime.strptime(
+            s, '%Y-%m-%d %H:%M:%SZ').timetuple())
+        for s in strings]
+
+    assert list(scraping.timestamps_from_iso1608(strings)) == expected
+    assert [scraping.timestamp_from_iso1608(s) for s in strings] == expected
+    assert [scraping.iso1608_from_timestamp(t) for t in expected] == strings
+
+    for bad in ['2015-04-20 01:00:15', '2015-13-20 01:00:15Z',
+                '2015-04-20T01:00:15Z', '2015-04-20 01:00:15Z ',
+                '2015-02-31 00:00:00Z', '2015-02-29 00:00:00Z',
+                '1900-02-29 00:00:00Z', '2015-04-31 00:00:00Z']:
+        with pytest.raises(ValueError):
+            scraping.timestamp_from_iso1608(bad)
+
+
+def test_json_round_trip():
+    import test_responses.so_help_badges_1973_caucus_x6dee as response
+
+    badge_data = scraping.BadgeData(badge_id=1973, host='stackoverflow.com')
+    badge_data._instances.update(badge_data._scrape_response(response))
+
+    data = badge_data.to_json()
+    assert data['format'] == 2
+    assert 'stack_time' not in data
+
+    def fields(badge_data):
+        return sorted(
+            (badge.timestamp, badge.user_id, badge.stack_time, badge.rep,
+             badge.gold, badge.reason_html, badge.username_html)
+            for badge in badge_data)
+
+    loaded = scraping.BadgeData.from_json(data)
+    assert fields(loaded) == fields(badge_data)
+
+    # The original format, with a list of instances, can still be read.
+    old_data = {
+        'host': 'stackoverflow.com',
+        'badge_id': 1973,
+        'instances': [
+            dict(badge.to_json(), stack_time=badge.stack_time)
+            for badge in badge_data]
+    }
+    assert fields(scraping.BadgeData.from_json(old_data)) == fields(badge_data)
+
+
+@pytest.mark.parametrize('memory_budget', [0, 1])
+def test_tiny_memory_budget(tmpdir, memory_budget):
+    badges = [
+        testing.make_badge(user_id=n, timestamp=n * 60) for n in range(1, 11)]
+    badge_data = scraping.BadgeData(
+        host='stackoverflow.com', badge_id=3109, instances=badges)
+
+    badge_data.set_memory_budget(memory_budget, spill_directory=str(tmpdir))
+
+    assert len(badge_data._instances) == 1
+    assert list(badge_data) == badges
+
+
+def test_from_json_reads_stack_time_instances():
+    badge = testing.make_badge(user_id=1, timestamp=1429491555)
+    instance = badge.to_json()
+    del instance['timestamp']
+    instance['stack_time'] = '2015-04-20 00:59:15Z'
+
+    badge_data = scraping.BadgeData.from_json({
+        'host': 'stackoverflow.com',
+        'badge_id': 3109,
+        'instances': [instance],
+    })
+
+    assert [b.timestamp for b in badge_data] == [1429491555]
+
+
+@pytest.mark.parametrize('marker, badge_count', [
+    (scraping.BadgeData.TABLE_MARKER, 0),
+    (scraping.BadgeData.PAGER_MARKER, 60),
+])
+def test_scrape_page_without_table_or_pager(marker, badge_count):
+    import test_responses.so_help_badges_1973_caucus_x6dee as response
+
+    class BrokenResponse(object):
+        text = response.text.replace(marker, '<div class="something-else')
+
+    fake_badge = scraping.BadgeData(badge_id=1973, host=None)
+    page_count_values = []
+    badges = list(fake_badge._scrape_response(
+        BrokenResponse, page_count_values))
+
+    assert len(badges) == badge_count
+    assert page_count_values == [1]
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+import collections
+import json
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+import uuid
+
+import scraping
+import storage
+
+
+logger = logging.getLogger(__name__)
+
+
+Job = collections.namedtuple('Job', ['host', 'badge_id', 'name'])
+
+
+# The badges election_observer tracks. Other sites can be added with a
+# registry file; see load_jobs().
+DEFAULT_JOBS = [
+    Job('stackoverflow.com', 3109, 'sheriff'),
+    Job('stackoverflow.com', 1974, 'constituent'),
+    Job('stackoverflow.com', 25, 'great-answers'),
+    Job('stackoverflow.com', 1973, 'caucus'),
+    Job('math.stackexchange.com', 208, 'constituent'),
+    Job('math.stackexchange.com', 207, 'caucus'),
+]
+
+
+def load_jobs(path):
+    """Loads a registry of jobs from a JSON file containing a list of
+    {"host": ..., "badge_id": ..., "name": ...} objects.
+    """
+    with open(path, 'rt') as f:
+        return [
+            Job(host=job['host'], badge_id=job['badge_id'], name=job['name'])
+            for job in json.load(f)]
+
+
+class Lease(object):
+    """Exclusive ownership of a job by one worker, recorded in a lease file.
+
+    Leases expire unless they're renewed, so that a job claimed by a worker
+    that has died will be claimed by another. Expiry compares timestamps from
+    different machines, so their clocks need to be roughly in sync.
+
+    Lease files are created by hard-linking a complete temporary file into
+    place, which fails if the lease file already exists, even on NFS.
+    """
+
+    logger = logging.getLogger(__name__).getChild('Lease')
+
+    def __init__(self, path, worker_id, duration_seconds):
+        self.path = path
+        self.worker_id = worker_id
+        self.duration_seconds = duration_seconds
+        self.token = uuid.uuid4().hex
+
+    @classmethod
+    def claim(cls, path, worker_id, duration_seconds):
+        """Returns a new Lease if the job at path was unclaimed or its lease
+        had expired, or None if another worker holds it.
+        """
+        lease = cls(path, worker_id, duration_seconds)
+        if lease._create():
+            return lease
+
+        holder = _read_lease(path)
+        if holder is None or holder['expires'] > time.time():
+            return None
+
+        # The lease has expired. Only one worker can rename it away.
+        expired_path = '{}.expired-{}'.format(path, lease.token)
+        try:
+            os.rename(path, expired_path)
+        except FileNotFoundError:
+            return None
+
+        expired = _read_lease(expired_path)
+        if expired is None or expired['token'] != holder['token']:
+            # Another worker took over the lease after we read it, so we've
+            # just removed a live lease. Put it back.
+            try:
+                os.link(expired_path, path)
+            except FileExistsError:
+                pass
+            os.remove(expired_path)
+            return None
+
+        os.remove(expired_path)
+        cls.logger.info(
+            "Taking over expired lease %s from %s.",
+            path, holder['worker_id'])
+
+        if lease._create():
+            return lease
+        return None
+
+    def renew(self):
+        """Extends the lease. Returns False if it has been lost."""
+        if not self.held():
+            return False
+
+        temporary_path = '{}.{}.tmp'.format(self.path, self.token)
+        self._write(temporary_path)
+        os.replace(temporary_path, self.path)
+        return True
+
+    def held(self):
+        holder = _read_lease(self.path)
+        return holder is not None and holder['token'] == self.token
+
+    def release(self):
+        if self.held():
+            os.remove(self.path)
+
+    def _create(self):
+        temporary_path = '{}.{}.tmp'.format(self.path, self.token)
+        self._write(temporary_path)
+        try:
+            os.link(temporary_path, self.path)
+            return True
+        except FileExistsError:
+            return False
+        finally:
+            os.remove(temporary_path)
+
+    def _write(self, path):
+        with open(path, 'wt') as f:
+            json.dump({
+                'worker_id': self.worker_id,
+                'token': self.token,
+                'expires': time.time() + self.duration_seconds,
+            }, f)
+
+    def __repr__(self):
+        return '<{0.__class__.__name__} {0.path} for {0.worker_id}>'.format(
+            self)
+
+
+def _read_lease(path):
+    try:
+        with open(path, 'rt') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def update_badge_data(badge_data):
+    badge_data.update()
+
+
+class Worker(object):
+    """Claims and runs jobs from a directory shared by any number of workers,
+    on any number of machines.
+
+    A job is run by loading its results/ data file, if any, calling update()
+    (or the given update function) on it, and publishing it back to results/.
+    Jobs whose data was published less than interval_seconds ago are skipped,
+    and jobs that fail are logged and left to be retried.
+
+    BadgeData.REQUEST_INTERVAL_SECONDS only spaces out the requests of each
+    process, so N workers scraping the same host make requests to it up to N
+    times as often.
+    """
+
+    logger = logging.getLogger(__name__).getChild('Worker')
+
+    def __init__(
+        self, directory, jobs, worker_id=None, lease_seconds=10 * 60,
+        interval_seconds=5 * 60, update=update_badge_data
+    ):
+        self.directory = directory
+        self.jobs = list(jobs)
+        self.worker_id = worker_id or '{}-{}'.format(
+            socket.gethostname(), os.getpid())
+        self.lease_seconds = lease_seconds
+        self.interval_seconds = interval_seconds
+        self.update = update
+
+        os.makedirs(os.path.join(directory, 'leases'), exist_ok=True)
+        os.makedirs(os.path.join(directory, 'results'), exist_ok=True)
+
+    def run(self, forever=False):
+        while True:
+            self.run_once()
+            if not forever:
+                return
+            time.sleep(self.interval_seconds / 10)
+
+    def run_once(self):
+        """Runs every job that's due and not claimed by another worker.
+
+        Returns the number of jobs whose results were published.
+        """
+        jobs_run = 0
+
+        for job in self.jobs:
+            if not self._is_due(job):
+                continue
+
+            lease = Lease.claim(
+                self._lease_path(job), self.worker_id, self.lease_seconds)
+            if lease is None:
+                self.logger.debug("%s is claimed by another worker.", job)
+                continue
+
+            try:
+                # Another worker may have finished it since we checked.
+                if self._is_due(job) and self._run_job(job, lease):
+                    jobs_run += 1
+            except Exception:
+                # Such as an HTTP error. Another worker (or this one, next
+                # time) will retry it.
+                self.logger.exception(
+                    "%s failed to run %s.", self.worker_id, job)
+            finally:
+                lease.release()
+
+        return jobs_run
+
+    def _run_job(self, job, lease):
+        """Updates a job's results and publishes them, unless the lease is
+        lost meanwhile. Returns whether they were published.
+        """
+        self.logger.info("%s running %s.", self.worker_id, job)
+
+        path_base = self._result_path_base(job)
+        try:
+            badge_data = storage.read_badge_data(path_base)
+        except FileNotFoundError:
+            badge_data = scraping.BadgeData(
+                host=job.host, badge_id=job.badge_id)
+
+        # Keep renewing the lease while we work, in case it takes a while.
+        finished = threading.Event()
+        def renew_until_finished():
+            while not finished.wait(self.lease_seconds / 3):
+                if not lease.renew():
+                    return
+        heartbeat = threading.Thread(target=renew_until_finished, daemon=True)
+        heartbeat.start()
+
+        try:
+            self.update(badge_data)
+        finally:
+            finished.set()
+            heartbeat.join()
+
+        if not lease.renew():
+            self.logger.warning(
+                "Lost the lease on %s, so not publishing results.", job)
+            return False
+
+        storage.write_badge_data(path_base + '.json.xz', badge_data)
+        self.logger.info(
+            "%s published %s badges for %s.",
+            self.worker_id, len(badge_data), job)
+        return True
+
+    def _is_due(self, job):
+        try:
+            published = os.path.getmtime(
+                storage.badge_data_file_path(self._result_path_base(job)))
+        except FileNotFoundError:
+            return True
+        return time.time() - published >= self.interval_seconds
+
+    def _lease_path(self, job):
+        return os.path.join(
+            self.directory, 'leases',
+            '{}-{}.lease'.format(job.host, job.badge_id))
+
+    def _result_path_base(self, job):
+        return os.path.join(
+            self.directory, 'results', '{}-{}'.format(job.host, job.name))
+
+
+def main(directory, *args):
+    flags = set(args)
+
+    jobs = DEFAULT_JOBS
+    for flag in list(flags):
+        if flag.startswith('--registry='):
+            jobs = load_jobs(flag.partition('=')[2])
+            flags.remove(flag)
+
+    assert not flags - {'-e', '--forever'}
+
+    logging.basicConfig(level=logging.INFO)
+
+    Worker(directory, jobs).run(
+        forever=bool(flags.intersection(['-e', '--forever'])))
+
+
+if __name__ == '__main__':
+    sys.exit(main(*sys.argv[1:]))
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+import logging
+import multiprocessing
+import os
+import time
+
+import sharding
+import storage
+import testing
+
+
+logger = logging.getLogger(__name__)
+
+
+def test_lease_is_exclusive_until_it_expires(tmpdir):
+    path = str(tmpdir.join('job.lease'))
+
+    first = sharding.Lease.claim(path, 'first', duration_seconds=0.2)
+    assert first is not None
+    assert first.held()
+    assert sharding.Lease.claim(path, 'second', duration_seconds=0.2) is None
+
+    assert first.renew()
+    time.sleep(0.3)
+
+    second = sharding.Lease.claim(path, 'second', duration_seconds=10)
+    assert second is not None
+    assert not first.held()
+    assert not first.renew()
+
+    first.release()
+    assert second.held()
+    second.release()
+    assert not os.path.exists(path)
+    assert tmpdir.listdir() == []
+
+
+def add_worker_badge(badge_data):
+    """An update function that records which process ran it."""
+    time.sleep(0.05)
+    badge_data._instances.add(testing.make_badge(
+        os.getpid(), int(time.time()), badge_id=badge_data.badge_id))
+
+
+def run_worker(directory, worker_id):
+    sharding.Worker(
+        directory, sharding.DEFAULT_JOBS, worker_id=worker_id,
+        update=add_worker_badge).run_once()
+
+
+def test_workers_share_jobs(tmpdir):
+    directory = str(tmpdir)
+
+    processes = [
+        multiprocessing.Process(
+            target=run_worker, args=(directory, 'worker-{}'.format(n)))
+        for n in range(3)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+
+    for job in sharding.DEFAULT_JOBS:
+        badge_data = storage.read_badge_data(os.path.join(
+            directory, 'results', '{}-{}'.format(job.host, job.name)))
+        # Each job should have been run exactly once.
+        assert len(badge_data) == 1
+
+    assert tmpdir.join('leases').listdir() == []
+
+
+def test_expired_lease_is_taken_over(tmpdir):
+    directory = str(tmpdir)
+    job = sharding.DEFAULT_JOBS[0]
+    worker = sharding.Worker(
+        directory, [job], worker_id='survivor', update=add_worker_badge)
+
+    # A worker that died while holding the lease.
+    sharding.Lease.claim(
+        worker._lease_path(job), 'dead', duration_seconds=0.1)
+    assert worker.run_once() == 0
+
+    time.sleep(0.2)
+    assert worker.run_once() == 1
+    assert worker.run_once() == 0
+
+
+def fail_on_math(badge_data):
+    if badge_data.host == 'math.stackexchange.com':
+        raise IOError("HTTP 503")
+    add_worker_badge(badge_data)
+
+
+def test_failed_job_does_not_stop_worker(tmpdir):
+    worker = sharding.Worker(
+        str(tmpdir), sharding.DEFAULT_JOBS, worker_id='worker',
+        update=fail_on_math)
+
+    assert worker.run_once() == 4
+    assert tmpdir.join('leases').listdir() == []
+    # The failed jobs are still due, and are retried.
+    worker.update = add_worker_badge
+    assert worker.run_once() == 2
+
+
+def test_job_with_lost_lease_is_not_counted(tmpdir):
+    directory = str(tmpdir)
+    job = sharding.DEFAULT_JOBS[0]
+
+    def lose_lease(badge_data):
+        # Another worker takes over the lease while this one is updating.
+        os.remove(worker._lease_path(job))
+        sharding.Lease.claim(
+            worker._lease_path(job), 'other', duration_seconds=10)
+        add_worker_badge(badge_data)
+
+    worker = sharding.Worker(
+        directory, [job], worker_id='slow', update=lose_lease)
+
+    assert worker.run_once() == 0
+    assert not os.path.exists(
+        worker._result_path_base(job) + '.json.xz')
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+import collections
+import concurrent.futures
+import json
+import logging
+import os
+import threading
+
+import compression
+import scraping
+
+
+logger = logging.getLogger(__name__)
+
+
+def badge_data_file_path(path_base):
+    """Returns the path of the data file for path_base: path_base + '.json'
+    followed by the extension of any compression.CODECS, or nothing. If there
+    are several, the most recently written is used.
+
+    Raises FileNotFoundError if there are none.
+    """
+
+    candidates = [path_base + '.json' + codec.extension
+                  for codec in compression.CODECS] + [path_base + '.json']
+    existing = [path for path in candidates if os.path.exists(path)]
+    if not existing:
+        raise FileNotFoundError("No data file for {}.".format(path_base))
+    return max(existing, key=os.path.getmtime)
+
+
+def read_badge_json(path_base):
+    """Reads and decompresses the data file for path_base, decompressing its
+    blocks in parallel if possible.
+    """
+
+    path = badge_data_file_path(path_base)
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    if not path.endswith('.json'):
+        data = compression.codec_for_path(path).decompress(data)
+
+    return json.loads(data.decode('utf-8'))
+
+
+def read_badge_data(path_base):
+    return scraping.BadgeData.from_json(read_badge_json(path_base))
+
+
+def read_badge_columns(path_base):
+    """Decodes a data file into the compact BadgeData.to_columns() form.
+
+    This is what the load_badge_data_in_parallel() worker processes run.
+    """
+
+    return scraping.BadgeData.columns_from_json(read_badge_json(path_base))
+
+
+def load_badge_data_in_parallel(path_bases, max_workers=None):
+    """Decodes several data files at once across a process pool.
+
+    Returns a dict mapping each of path_bases to its BadgeData, or to None if
+    it has no data file. The largest files are started first, so the total
+    time is bounded by the largest file rather than the sum of all of them.
+
+    With only one worker there's nothing to gain from the pool, so the files
+    are just decoded in this process.
+    """
+
+    def compressed_size(path_base):
+        try:
+            return os.path.getsize(badge_data_file_path(path_base))
+        except OSError:
+            return 0
+
+    path_bases = sorted(set(path_bases), key=compressed_size, reverse=True)
+
+    if (max_workers or os.cpu_count() or 1) == 1:
+        loaded = {}
+        for path_base in path_bases:
+            try:
+                loaded[path_base] = read_badge_data(path_base)
+            except FileNotFoundError:
+                loaded[path_base] = None
+        return loaded
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers) as executor:
+        futures = {
+            path_base: executor.submit(read_badge_columns, path_base)
+            for path_base in path_bases
+        }
+
+        loaded = {}
+        for path_base in path_bases:
+            try:
+                columns = futures[path_base].result()
+            except FileNotFoundError:
+                loaded[path_base] = None
+            else:
+                loaded[path_base] = scraping.BadgeData.from_columns(columns)
+
+    return loaded
+
+
+def write_badge_data(path, badge_data, codec=None):
+    """Serializes and compresses badge_data to path, using codec or the
+    default compression.Codec for the path's extension.
+
+    The data is written to a temporary file which then replaces path, so an
+    interrupted write leaves the previous version of the file intact.
+    """
+
+    if codec is None:
+        codec = compression.codec_for_path(path)
+
+    data = json.dumps(badge_data.to_json()).encode('utf-8')
+
+    temporary_path = path + '.tmp'
+    with open(temporary_path, 'wb') as f:
+        f.write(codec.compress(data))
+    os.replace(temporary_path, path)
+
+
+class BackgroundWriter(object):
+    """Writes BadgeData to disk on a background thread.
+
+    submit() only takes a snapshot of the data, leaving serialization and
+    compression to the writer thread. If a path is submitted again before its
+    previous snapshot has been written, only the newer snapshot is written.
+
+    Failed writes are logged, and close() raises an error if the last write
+    of any path failed.
+    """
+
+    logger = logging.getLogger(__name__).getChild('BackgroundWriter')
+
+    def __init__(self, profiler=None):
+        # A profiling.Profiler whose iterations should include our writes.
+        self.profiler = profiler
+        self._pending = collections.OrderedDict()
+        self._writing = None
+        self._closed = False
+        # Paths whose last write failed, mapped to the exception.
+        self._failures = {}
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(
+            target=self._run, name='BackgroundWriter', daemon=True)
+        self._thread.start()
+
+    def submit(self, path, badge_data, codec=None, on_written=None):
+        """Queues badge_data to be written to path. Once it has been written
+        successfully, on_written (if given) is called on the writer thread
+        with the generation of the data that was written.
+        """
+        snapshot = badge_data.snapshot()
+        with self._condition:
+            if self._closed:
+                raise ValueError("BackgroundWriter has been closed.")
+            if path in self._pending:
+                self.logger.debug("Replacing pending write of %s.", path)
+            self._pending[path] = snapshot, codec, on_written
+            self._condition.notify_all()
+
+    def flush(self):
+        """Blocks until every submitted snapshot has been written."""
+        with self._condition:
+            while self._pending or self._writing is not None:
+                self._condition.wait()
+
+    def close(self):
+        """Flushes pending writes and stops the writer thread.
+
+        Raises RuntimeError if the last write of any path failed.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+
+        if self._failures:
+            path, exception = next(iter(self._failures.items()))
+            raise RuntimeError(
+                "Failed to write {}.".format(
+                    ', '.join(sorted(self._failures)))) from exception
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if not self._pending:
+                    return
+                path, (snapshot, codec, on_written) = self._pending.popitem(
+                    last=False)
+                self._writing = path
+
+            try:
+                self.logger.info(
+                    "Writing {} badges to {}...".format(len(snapshot), path))
+                if self.profiler is not None:
+                    with self.profiler.thread_scope():
+                        write_badge_data(path, snapshot, codec)
+                else:
+                    write_badge_data(path, snapshot, codec)
+                self.logger.info(
+                    "...wrote {} badges to {}.".format(len(snapshot), path))
+            except Exception as exception:
+                self.logger.exception("Failed to write %s.", path)
+                self._failures[path] = exception
+            else:
+                self._failures.pop(path, None)
+                if on_written is not None:
+                    on_written(snapshot.generation)
+            finally:
+                with self._condition:
+                    self._writing = None
+                    self._condition.notify_all()
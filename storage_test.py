@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+import json
+import logging
+import lzma
+
+import pytest
+
+import scraping
+import storage
+import testing
+
+
+logger = logging.getLogger(__name__)
+
+
+def test_snapshot_is_unaffected_by_later_additions():
+    badge_data = scraping.BadgeData(
+        host='stackoverflow.com', badge_id=3109,
+        instances=[testing.make_badge(1, 100)])
+
+    snapshot = badge_data.snapshot()
+    badge_data._instances.add(testing.make_badge(2, 200))
+
+    assert len(snapshot) == 1
+    assert len(badge_data) == 2
+
+
+def test_background_writer_writes_latest_snapshot(tmpdir):
+    path = str(tmpdir.join('sheriff.json.xz'))
+    badge_data = scraping.BadgeData(host='stackoverflow.com', badge_id=3109)
+
+    writer = storage.BackgroundWriter()
+    for user_id in range(1, 6):
+        badge_data._instances.add(testing.make_badge(user_id, user_id * 100))
+        writer.submit(path, badge_data)
+    writer.close()
+
+    with lzma.open(path, 'rt') as f:
+        written = scraping.BadgeData.from_json(json.load(f))
+
+    assert [badge.user_id for badge in written] == [1, 2, 3, 4, 5]
+    assert not tmpdir.join('sheriff.json.xz.tmp').check()
+
+
+def test_background_writer_rejects_submissions_after_close(tmpdir):
+    writer = storage.BackgroundWriter()
+    writer.close()
+
+    with pytest.raises(ValueError):
+        writer.submit(
+            str(tmpdir.join('x.json.xz')),
+            scraping.BadgeData(host='stackoverflow.com', badge_id=3109))
+
+
+def test_load_badge_data_in_parallel(tmpdir):
+    sheriffs = scraping.BadgeData(
+        host='stackoverflow.com', badge_id=3109,
+        instances=[testing.make_badge(1, 100), testing.make_badge(2, 200)])
+    storage.write_badge_data(str(tmpdir.join('sheriff.json.xz')), sheriffs)
+
+    missing_path = str(tmpdir.join('missing'))
+    sheriff_path = str(tmpdir.join('sheriff'))
+    loaded = storage.load_badge_data_in_parallel(
+        [sheriff_path, missing_path], max_workers=2)
+
+    assert loaded[missing_path] is None
+    assert loaded[sheriff_path].host == 'stackoverflow.com'
+    assert list(loaded[sheriff_path]) == list(sheriffs)
+    assert ([badge.rep for badge in loaded[sheriff_path]] ==
+            [badge.rep for badge in sheriffs])
+
+
+@pytest.mark.parametrize('extension', ['.xz', '.gz'])
+def test_write_and_read_compressed(tmpdir, extension):
+    badge_data = scraping.BadgeData(
+        host='stackoverflow.com', badge_id=3109,
+        instances=[testing.make_badge(i, 100 * i) for i in range(1, 50)])
+
+    path_base = str(tmpdir.join('sheriff'))
+    storage.write_badge_data(path_base + '.json' + extension, badge_data)
+
+    assert storage.badge_data_file_path(path_base) == (
+        path_base + '.json' + extension)
+    assert len(storage.read_badge_data(path_base)) == 49
+
+
+def test_background_writer_reports_failed_writes(tmpdir):
+    badge_data = scraping.BadgeData(
+        host='stackoverflow.com', badge_id=3109,
+        instances=[testing.make_badge(1, 100)])
+    badge_data.generation = 1
+    written_generations = []
+
+    writer = storage.BackgroundWriter()
+    writer.submit(
+        str(tmpdir.join('sheriff.json.xz')), badge_data,
+        on_written=written_generations.append)
+    writer.submit(
+        str(tmpdir.join('missing', 'sheriff.json.xz')), badge_data,
+        on_written=written_generations.append)
+
+    with pytest.raises(RuntimeError):
+        writer.close()
+    assert written_generations == [1]
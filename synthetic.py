@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+import logging
+import math
+import random
+
+import scraping
+
+
+logger = logging.getLogger(__name__)
+
+
+CONSTITUENT_BADGE_ID = 1974
+CAUCUS_BADGE_ID = 1973
+FIRST_ELECTION_TIMESTAMP = scraping.timestamp_from_iso1608(
+    '2011-01-10 20:00:00Z')
+ELECTION_INTERVAL_SECONDS = 182 * 24 * 60 * 60
+PAGE_SIZE = 60
+
+
+def generate_elections(
+    host, election_count, voters_per_election, user_count=None, seed=0
+):
+    """Returns constituent and caucus BadgeData for a series of elections,
+    shaped like the real ones.
+
+    Each election's Caucus badges come in a burst when it starts, tailing
+    off over the next week, and its Constituent badges in another when
+    voting opens four days later. Every voter also received the Caucus
+    badge, and users with low ids are more active, so many vote in several
+    elections.
+    """
+    rng = random.Random(seed)
+    caucus_per_election = int(voters_per_election / 0.6)
+    if user_count is None:
+        user_count = 10 * caucus_per_election
+
+    constituents = []
+    caucus = []
+
+    for election_id in range(1, election_count + 1):
+        reason_html = 'for an <a href="/election/{}">election</a>'.format(
+            election_id)
+        start_timestamp = (
+            FIRST_ELECTION_TIMESTAMP +
+            (election_id - 1) * ELECTION_INTERVAL_SECONDS)
+
+        caucus_users = set()
+        while len(caucus_users) < caucus_per_election:
+            caucus_users.add(_active_user_id(rng, user_count))
+        voters = rng.sample(sorted(caucus_users), voters_per_election)
+
+        for user_id in caucus_users:
+            caucus.append(_badge(
+                rng, CAUCUS_BADGE_ID, reason_html, user_id,
+                _burst_timestamp(
+                    rng, start_timestamp, 8 * 24 * 60 * 60, 18 * 60 * 60)))
+        for user_id in voters:
+            constituents.append(_badge(
+                rng, CONSTITUENT_BADGE_ID, reason_html, user_id,
+                _burst_timestamp(
+                    rng, start_timestamp + 4 * 24 * 60 * 60,
+                    4 * 24 * 60 * 60, 12 * 60 * 60)))
+
+    logger.info(
+        "Generated %s elections with %s constituent and %s caucus badges.",
+        election_count, len(constituents), len(caucus))
+
+    return (
+        scraping.BadgeData(
+            host=host, badge_id=CONSTITUENT_BADGE_ID, instances=constituents),
+        scraping.BadgeData(
+            host=host, badge_id=CAUCUS_BADGE_ID, instances=caucus))
+
+
+def _active_user_id(rng, user_count):
+    # Skewed towards low ids, like real activity.
+    return 1 + int(user_count * rng.random() ** 2)
+
+
+def _burst_timestamp(rng, start_timestamp, duration_seconds, mean_seconds):
+    """Returns a time within duration_seconds of start_timestamp, most often
+    near the start, like the rush of badges when an election phase opens.
+    """
+    while True:
+        offset = int(rng.expovariate(1 / mean_seconds))
+        if offset < duration_seconds:
+            return start_timestamp + offset
+
+
+def _badge(rng, badge_id, reason_html, user_id, timestamp):
+    badge = scraping.Badge(badge_id=badge_id)
+    badge.reason_html = reason_html
+    badge.user_id = user_id
+    badge.timestamp = timestamp
+    # The scraper never finds usernames, so neither do we.
+    badge.username_html = None
+    badge.rep = 1 + int(rng.lognormvariate(6, 2))
+    badge.gold = badge.rep // 20000
+    badge.silver = badge.rep // 1000
+    badge.bronze = badge.rep // 200
+    return badge
+
+
+def page_count(badge_count, page_size=PAGE_SIZE):
+    return max(1, math.ceil(badge_count / page_size))
+
+
+def badge_page_html(
+    badge_data, page_number, badges=None, page_size=PAGE_SIZE
+):
+    """Returns the HTML of a page of /help/badges/{id} for badge_data, laid
+    out like the pages in test_responses, with the newest badges first.
+
+    badges may be given as a newest-first list of badge_data's instances, to
+    avoid sorting them again for every page.
+    """
+    if badges is None:
+        badges = sorted(badge_data, key=lambda badge: -badge.timestamp)
+
+    rows = badges[(page_number - 1) * page_size:page_number * page_size]
+    pages = page_count(len(badges), page_size)
+
+    return ''.join([
+        _PAGE_HEADER.format(
+            badge_id=badge_data.badge_id, badge_count=len(badges)),
+        ''.join(_badge_row_html(badge) for badge in rows),
+        _PAGE_FOOTER.format(
+            pager=_pager_html(badge_data.badge_id, page_number, pages)),
+    ])
+
+
+def _badge_row_html(badge):
+    if badge.rep >= 10000:
+        rep_html = (
+            '<span class="reputation-score" title="reputation score {}" '
+            'dir="ltr">{}k</span>'.format(badge.rep, badge.rep // 1000))
+    else:
+        rep_html = (
+            '<span class="reputation-score" title="reputation score " '
+            'dir="ltr">{:,}</span>'.format(badge.rep))
+
+    for count, name, number in [
+            (badge.gold, 'gold', 1),
+            (badge.silver, 'silver', 2),
+            (badge.bronze, 'bronze', 3)]:
+        if count:
+            rep_html += (
+                '<span title="{0} {1} badge{2}"><span class="badge{3}">'
+                '</span><span class="badgecount">{0}</span></span>'.format(
+                    count, name, '' if count == 1 else 's', number))
+
+    return _ROW.format(
+        kind='reason' if badge.reason_html else 'double',
+        stack_time=badge.stack_time,
+        user_id=badge.user_id,
+        rep_html=rep_html,
+        reason_html=(
+            _REASON.format(reason_html=badge.reason_html)
+            if badge.reason_html else ''))
+
+
+def _pager_html(badge_id, page_number, pages):
+    links = []
+    # Like the site's, this links to the first, previous, next and last
+    # pages, so on the last page the highest link is to the previous one.
+    numbers = {1, max(page_number - 1, 1), page_number}
+    if page_number < pages:
+        numbers.update([page_number + 1, pages])
+    for number in sorted(numbers):
+        if number == page_number:
+            links.append(
+                ' <span class="page-numbers current">{}</span> '.format(
+                    number))
+        else:
+            links.append(
+                '<a href="/help/badges/{0}?page={1}" title="go to page {1}">'
+                ' <span class="page-numbers">{1}</span> </a>'.format(
+                    badge_id, number))
+    return '\n'.join(links)
+
+
+_PAGE_HEADER = '''\
+<!DOCTYPE html>
+<html>
+<head>
+    <title>Badge - Synthetic</title>
+</head>
+<body>
+<div id="mainbar" class="ask-mainbar box-border">
+    <div class="single-badge-table">
+        <div class="single-badge-header">
+            <div class="single-badge-wrapper">
+                <div class="single-badge-badge">
+                    <a  href="/help/badges/{badge_id}/synthetic" class="badge">Synthetic</a>
+                </div>
+            </div>
+                <div class="single-badge-count">
+                    Awarded {badge_count} times
+                </div>
+        </div>
+    </div>
+
+    <div class="single-badge-table">
+'''
+
+_ROW = '''\
+                <div class="single-badge-row-{kind}">
+                    <div class="single-badge-awarded">
+                        Awarded <span title="{stack_time}" class="relativetime">{stack_time}</span> to
+                    </div>
+                    <div class="single-badge-user">
+<div class="user-info ">
+    <div class="user-action-time">
+
+    </div>
+    <div class="user-gravatar32">
+        <a href="/users/{user_id}/user{user_id}"><div class="gravatar-wrapper-32"><img src="https://www.gravatar.com/avatar/?s=32" alt="" width="32" height="32"></div></a>
+    </div>
+    <div class="user-details">
+        <a href="/users/{user_id}/user{user_id}">user{user_id}</a><br>
+        {rep_html}
+    </div>
+</div>                    </div>
+{reason_html}                </div>
+'''
+
+_REASON = '''\
+                    <div class="single-badge-reason">
+{reason_html}                    </div>
+'''
+
+_PAGE_FOOTER = '''\
+    </div>
+    <div class="pager fl">
+{pager}
+    </div>
+</div>
+</body>
+</html>
+'''
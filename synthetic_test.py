@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+import logging
+
+import election_observer
+import synthetic
+
+
+logger = logging.getLogger(__name__)
+
+
+def test_generate_elections():
+    constituents, caucus = synthetic.generate_elections(
+        'stackoverflow.com', election_count=3, voters_per_election=200)
+
+    constituents_by_reason = constituents.by_reason()
+    caucus_by_reason = caucus.by_reason()
+    assert len(constituents) == 600
+    assert len(constituents_by_reason) == 3
+
+    for reason, badges in constituents_by_reason.items():
+        election = election_observer.ElectionData(
+            host='stackoverflow.com',
+            constituent_badges=badges,
+            caucus_badges=caucus_by_reason[reason])
+        assert election.constituent_users <= election.caucus_users
+        assert election.start_timestamp < election.election_timestamp
+        # Most badges come in the first day of each burst.
+        assert sum(election.constituents_by_hour[:24 * 5]) > len(badges) / 2
+
+    again = synthetic.generate_elections(
+        'stackoverflow.com', election_count=3, voters_per_election=200)
+    assert [badge.to_json() for badge in again[0]] == [
+        badge.to_json() for badge in constituents]
+
+
+def test_badge_pages_are_scraped_back_exactly():
+    constituents, _ = synthetic.generate_elections(
+        'stackoverflow.com', election_count=2, voters_per_election=100)
+    newest_first = sorted(constituents, key=lambda badge: -badge.timestamp)
+
+    scraped = []
+    page_count_values = []
+    for page_number in range(1, synthetic.page_count(200) + 1):
+        html = synthetic.badge_page_html(
+            constituents, page_number, newest_first)
+        scraped.extend(constituents._scrape_chunks(
+            [html[start:start + 1000] for start in range(0, len(html), 1000)],
+            page_count_values))
+
+    assert page_count_values[0] == 4
+    assert [badge.to_json() for badge in scraped] == [
+        badge.to_json() for badge in newest_first]
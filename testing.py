@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+import logging
+
+import scraping
+
+
+logger = logging.getLogger(__name__)
+
+
+def make_badge(user_id, timestamp, badge_id=3109, reason_html=None):
+    """Returns a Badge with the given fields, for tests."""
+    return scraping.Badge.from_json({
+        'reason_html': reason_html,
+        'user_id': user_id,
+        'timestamp': timestamp,
+        'username_html': None,
+        'rep': 1,
+        'gold': 0,
+        'silver': 0,
+        'bronze': 0,
+    }, badge_id=badge_id)